@@ -3,39 +3,51 @@ GUVI Agentic Scam HoneyPot - FastAPI Application
 Main API server with x-api-key authentication
 """
 
+import hmac
+import logging
 import time
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Header, Request, status
+from fastapi import FastAPI, HTTPException, Header, Request, Depends, status
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from core.config import settings
-from core.models import (
-    IncomingRequest, AgentResponse, SessionState, Message,
-    ScamDetectionResult, EngagementMetrics
-)
-from core.detector import detect_scam
-from core.extractor import extract_intelligence
+from core.models import IncomingRequest, AgentResponse, SessionState, Message
+from core.analyzer import analyze_messages
 from core.agent import create_agent, AutonomousAgent
-from core.database import save_session, get_session, mark_callback_sent
-from core.callback import send_guvi_callback
+from core.database import (
+    get_session, save_session, atomic_finalize, start_db_writer, stop_db_writer
+)
+from core.callback import (
+    send_guvi_callback, schedule_guvi_callback,
+    start_callback_worker, stop_callback_worker, close_callback_client
+)
+from core.redis_client import close_redis
+from core.logging_config import start_logging, stop_logging
 
 
-# In-memory store for active agents
-active_agents: Dict[str, AutonomousAgent] = {}
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
-    print(f"🚀 Starting {settings.APP_NAME}")
-    print(f"📍 GUVI Callback URL: {settings.GUVI_CALLBACK_URL}")
+    start_logging()
+    logger.info("🚀 Starting %s", settings.APP_NAME)
+    logger.info("📍 GUVI Callback URL: %s", settings.GUVI_CALLBACK_URL)
+    start_callback_worker()
+    start_db_writer()
     yield
-    print("👋 Shutting down...")
+    logger.info("👋 Shutting down...")
+    await stop_callback_worker()
+    await stop_db_writer()
+    await close_callback_client()
+    await close_redis()
+    stop_logging()
 
 
 # Create FastAPI app
@@ -56,16 +68,18 @@ app.add_middleware(
 )
 
 
-# Authentication middleware
-async def verify_api_key(x_api_key: Optional[str] = Header(None)) -> str:
-    """Verify x-api-key header"""
+# Authentication dependency
+async def verify_api_key(
+    x_api_key: Optional[str] = Header(None, description="API Key for authentication")
+) -> str:
+    """Verify x-api-key header (constant-time compare)"""
     if not x_api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing x-api-key header"
         )
     
-    if x_api_key != settings.API_KEY:
+    if not hmac.compare_digest(x_api_key.encode(), settings.API_KEY.encode()):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
@@ -98,7 +112,7 @@ async def health_check():
 @app.post("/api/scam-detection", response_model=AgentResponse, tags=["Scam Detection"])
 async def scam_detection(
     request: IncomingRequest,
-    x_api_key: str = Header(..., description="API Key for authentication")
+    x_api_key: str = Depends(verify_api_key)
 ):
     """
     Main GUVI API Endpoint - Process incoming scam messages
@@ -111,10 +125,7 @@ async def scam_detection(
     
     **Authentication:** Requires `x-api-key` header
     """
-    start_time = time.time()
-    
-    # Verify API key
-    await verify_api_key(x_api_key)
+    start_time = time.monotonic()
     
     try:
         session_id = request.sessionId
@@ -130,91 +141,72 @@ async def scam_detection(
             )
         
         # Add current message to session
-        session.messages.append(request.message)
+        session.add_message(request.message)
         
         # Add conversation history if provided
         if request.conversationHistory:
             # Only add messages not already in session
-            existing = {(m.sender, m.text) for m in session.messages}
             for msg in request.conversationHistory:
-                if (msg.sender, msg.text) not in existing:
-                    session.messages.append(msg)
+                if not session.has_message(msg):
+                    session.add_message(msg)
         
         # Update metadata
         if request.metadata:
             session.metadata = request.metadata.model_dump()
         
-        # ========== STEP 1: SCAM DETECTION ==========
-        detection_result = detect_scam(session.messages)
-        session.detectionResult = detection_result
-        
-        print(f"[SESSION {session_id}] Scam detected: {detection_result.scamDetected} (confidence: {detection_result.confidenceScore})")
-        
-        # ========== STEP 2: INTELLIGENCE EXTRACTION ==========
-        extracted_intel = extract_intelligence(session.messages)
-        
-        # Merge with existing intelligence (avoid duplicates)
-        for upi in extracted_intel.upiIds:
-            if upi not in session.extractedIntelligence.upiIds:
-                session.extractedIntelligence.upiIds.append(upi)
-        
-        for bank in extracted_intel.bankAccounts:
-            if bank not in session.extractedIntelligence.bankAccounts:
-                session.extractedIntelligence.bankAccounts.append(bank)
-        
-        for ifsc in extracted_intel.ifscCodes:
-            if ifsc not in session.extractedIntelligence.ifscCodes:
-                session.extractedIntelligence.ifscCodes.append(ifsc)
+        # ========== STEP 1: SCAM DETECTION + INTELLIGENCE EXTRACTION ==========
+        # Single pass over messages added since the last analysis
+        prior_detection = session.detectionResult
+        analyzed = prior_detection.messagesAnalyzed if prior_detection else 0
         
-        for link in extracted_intel.phishingLinks:
-            if link not in session.extractedIntelligence.phishingLinks:
-                session.extractedIntelligence.phishingLinks.append(link)
-        
-        for phone in extracted_intel.phoneNumbers:
-            if phone not in session.extractedIntelligence.phoneNumbers:
-                session.extractedIntelligence.phoneNumbers.append(phone)
+        detection_result, session.extractedIntelligence = analyze_messages(
+            session.messages[analyzed:],
+            prior_detection,
+            session.extractedIntelligence
+        )
+        session.detectionResult = detection_result
         
-        for kw in extracted_intel.suspiciousKeywords:
-            if kw not in session.extractedIntelligence.suspiciousKeywords:
-                session.extractedIntelligence.suspiciousKeywords.append(kw)
+        logger.info(
+            "[SESSION %s] Scam detected: %s (confidence: %s)",
+            session_id, detection_result.scamDetected, detection_result.confidenceScore
+        )
         
-        # ========== STEP 3: AGENT HANDOFF & RESPONSE ==========
+        # ========== STEP 2: AGENT HANDOFF & RESPONSE ==========
         agent_response = ""
+        agent = None
         
         if detection_result.scamDetected and detection_result.confidenceScore >= settings.SCAM_DETECTION_THRESHOLD:
             # Get or create agent
-            if session_id not in active_agents:
+            agent = await AutonomousAgent.load(session_id)
+            if agent is None:
                 agent = create_agent(session_id, detection_result.scamType)
-                active_agents[session_id] = agent
-            else:
-                agent = active_agents[session_id]
             
             # Generate agent response
             agent_response = agent.generate_response(
-                session.messages,
+                session.last_scammer_text,
                 session.extractedIntelligence
             )
+            await agent.persist()
             
             # Add agent response to session
-            session.messages.append(Message(sender="agent", text=agent_response))
+            session.add_message(Message(sender="agent", text=agent_response))
             
-            print(f"[SESSION {session_id}] Agent engaged. Response: {agent_response[:50]}...")
+            logger.info("[SESSION %s] Agent engaged. Response: %.50s...", session_id, agent_response)
         else:
             # Not a scam or low confidence - generic response
             agent_response = "Thank you for the information. I'll look into this."
         
-        # ========== STEP 4: UPDATE METRICS ==========
-        scammer_msgs = len([m for m in session.messages if m.sender == "scammer"])
-        agent_msgs = len([m for m in session.messages if m.sender == "agent"])
+        # ========== STEP 3: UPDATE METRICS ==========
+        scammer_msgs = session.scammerMessageCount
         
-        session.engagementMetrics = EngagementMetrics(
-            totalMessagesExchanged=len(session.messages),
-            numberOfTurns=scammer_msgs,
-            engagementDurationSeconds=time.time() - start_time,
-            scamDetectionConfidence=detection_result.confidenceScore
-        )
+        # Updated in place: plain attribute sets skip re-validating a new model
+        metrics = session.engagementMetrics
+        metrics.totalMessagesExchanged = len(session.messages)
+        metrics.numberOfTurns = scammer_msgs
+        metrics.engagementDurationSeconds = time.monotonic() - start_time
+        metrics.scamDetectionConfidence = detection_result.confidenceScore
         
-        # ========== STEP 5: CHECK IF READY FOR CALLBACK ==========
+        # ========== STEP 4: CHECK IF READY FOR CALLBACK ==========
         should_send_callback = (
             detection_result.scamDetected and
             scammer_msgs >= settings.MIN_TURNS_BEFORE_CALLBACK and
@@ -224,38 +216,25 @@ async def scam_detection(
         
         if should_send_callback:
             # Generate agent notes
-            agent = active_agents.get(session_id)
             if agent:
                 session.agentNotes = agent.generate_agent_notes(session.extractedIntelligence)
             
-            # Save session before callback
-            await save_session(session)
-            
-            # Send callback to GUVI (MANDATORY)
-            print(f"[SESSION {session_id}] Sending callback to GUVI...")
-            callback_success = await send_guvi_callback(session)
-            
-            if callback_success:
-                session.callbackSent = True
-                await mark_callback_sent(session_id)
-                print(f"[SESSION {session_id}] ✅ Callback sent successfully")
-            else:
-                print(f"[SESSION {session_id}] ❌ Callback failed - will retry on next message")
+            # Send callback to GUVI (MANDATORY) - delivered in background, retried on failure
+            logger.info("[SESSION %s] Scheduling callback to GUVI...", session_id)
+            await schedule_guvi_callback(session)
         
-        # Save session
+        # Save session; callback_sent is set by the callback client once delivery succeeds
         session.updatedAt = datetime.utcnow()
         await save_session(session)
         
-        # ========== STEP 6: RETURN RESPONSE ==========
+        # ========== STEP 5: RETURN RESPONSE ==========
         return AgentResponse(
             status="success",
             reply=agent_response
         )
         
     except Exception as e:
-        print(f"Error processing request: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error processing request: %s", e)
         
         # Return error response
         return AgentResponse(
@@ -267,12 +246,11 @@ async def scam_detection(
 @app.get("/api/session/{session_id}", tags=["Monitoring"])
 async def get_session_state(
     session_id: str,
-    x_api_key: str = Header(...)
+    x_api_key: str = Depends(verify_api_key)
 ):
     """Get session state (for debugging/monitoring)"""
-    await verify_api_key(x_api_key)
-    
-    session = await get_session(session_id)
+    # Messages aren't part of the response, so skip loading them
+    session = await get_session(session_id, include_messages=False)
     
     if not session:
         raise HTTPException(
@@ -298,11 +276,9 @@ async def get_session_state(
 @app.post("/api/force-callback/{session_id}", tags=["Admin"])
 async def force_callback(
     session_id: str,
-    x_api_key: str = Header(...)
+    x_api_key: str = Depends(verify_api_key)
 ):
     """Force send callback for a session (admin only)"""
-    await verify_api_key(x_api_key)
-    
     session = await get_session(session_id)
     
     if not session:
@@ -313,7 +289,7 @@ async def force_callback(
     
     # Generate agent notes if not present
     if not session.agentNotes:
-        agent = active_agents.get(session_id)
+        agent = await AutonomousAgent.load(session_id)
         if agent:
             session.agentNotes = agent.generate_agent_notes(session.extractedIntelligence)
         else:
@@ -323,8 +299,8 @@ async def force_callback(
     success = await send_guvi_callback(session)
     
     if success:
-        session.callbackSent = True
-        await mark_callback_sent(session_id)
+        await atomic_finalize(session, mark_sent=True)
+        AutonomousAgent.release(session_id)
         return {"status": "success", "message": "Callback sent successfully"}
     else:
         return {"status": "error", "message": "Callback failed"}
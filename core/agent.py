@@ -3,12 +3,43 @@ GUVI Agentic Scam HoneyPot - Autonomous Agent
 Engages scammers naturally with believable persona
 """
 
+import json
 import random
-from typing import List, Optional
-from datetime import datetime
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
 
-from core.models import Message, ExtractedIntelligence, ScamType
+from core.models import ExtractedIntelligence, ScamType
 from core.config import PERSONAS, EXTRACTION_QUESTIONS, settings
+from core.extractor import url_red_flags
+from core.redis_client import get_redis
+
+
+# Redis hash key prefix for agent state
+AGENT_KEY_PREFIX = "honeypot:agent:"
+
+# Personas indexed by display name (what gets persisted)
+PERSONAS_BY_NAME = {p["name"]: p for p in PERSONAS.values()}
+
+# Fallback store when Redis is not configured (single worker only),
+# kept in LRU order and capped at settings.MAX_ACTIVE_AGENTS
+_local_agents: "OrderedDict[str, AutonomousAgent]" = OrderedDict()
+
+# Persona flavor appended to extraction questions
+PERSONA_SUFFIX = {
+    "Ramesh": " I want to make sure I do it correctly.",  # Confused elderly
+    "Priya": " I want to help.",  # Cooperative
+    "Vikram": " I need to verify this first.",  # Skeptical
+}
+
+# Strategy trigger vocab, compiled once (substring match, same as `word in msg`)
+UPI_TRIGGERS = re.compile("upi|paytm|phonepe")
+BANK_TRIGGERS = re.compile("bank|account|transfer")
+PHONE_TRIGGERS = re.compile("call|phone|contact")
+LINK_TRIGGERS = re.compile("click|link|website")
+URGENCY_TRIGGERS = re.compile("hurry|quick|now|urgent|immediately")
+REQUEST_TRIGGERS = re.compile("send|share|provide|give")
 
 
 class ConversationMemory:
@@ -51,6 +82,25 @@ class ConversationMemory:
         from collections import Counter
         counts = Counter(self.last_topics)
         return [t for t, c in counts.items() if c > 1]
+    
+    def to_dict(self) -> dict:
+        """Serialize memory for persistence"""
+        return {
+            "scammer_claims": self.scammer_claims,
+            "extracted_so_far": self.extracted_so_far,
+            "extraction_attempts": self.extraction_attempts,
+            "last_topics": self.last_topics,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConversationMemory":
+        """Restore memory from persisted dict"""
+        memory = cls()
+        memory.scammer_claims = data.get("scammer_claims", [])
+        memory.extracted_so_far.update(data.get("extracted_so_far", {}))
+        memory.extraction_attempts.update(data.get("extraction_attempts", {}))
+        memory.last_topics = data.get("last_topics", [])
+        return memory
 
 
 class AutonomousAgent:
@@ -58,13 +108,16 @@ class AutonomousAgent:
     Autonomous agent that engages scammers naturally
     """
     
-    def __init__(self, session_id: str, scam_type: ScamType):
+    def __init__(self, session_id: str, scam_type: ScamType,
+                 persona: Optional[dict] = None, seed: Optional[int] = None):
         self.session_id = session_id
         self.scam_type = scam_type
-        self.persona = self._select_persona()
+        self._rng = random.Random(seed)  # Per-agent, no shared global state
+        self.persona = persona or self._select_persona()
+        self._extraction_questions = self._build_extraction_questions()
         self.memory = ConversationMemory()
         self.turn_count = 0
-        self.start_time = datetime.utcnow()
+        self.start_time = time.time()  # Epoch seconds; comparable across workers
     
     def _select_persona(self) -> dict:
         """Select appropriate persona based on scam type"""
@@ -77,10 +130,18 @@ class AutonomousAgent:
             return PERSONAS["curious"]  # Curious for fake offers
         else:
             # Random for other types
-            return random.choice(list(PERSONAS.values()))
+            return self._rng.choice(list(PERSONAS.values()))
+    
+    def _build_extraction_questions(self) -> Dict[str, List[str]]:
+        """Precompute extraction questions with persona flavor"""
+        suffix = PERSONA_SUFFIX.get(self.persona["name"], "")
+        return {
+            data_type: [q + suffix for q in questions]
+            for data_type, questions in EXTRACTION_QUESTIONS.items()
+        }
     
     def generate_response(self, 
-                         messages: List[Message],
+                         last_scammer_text: Optional[str],
                          extracted: ExtractedIntelligence) -> str:
         """
         Generate human-like response to engage scammer
@@ -92,16 +153,11 @@ class AutonomousAgent:
         """
         self.turn_count += 1
         
-        # Get last scammer message
-        last_scammer_msg = None
-        for m in reversed(messages):
-            if m.sender == "scammer":
-                last_scammer_msg = m.text.lower()
-                break
-        
-        if not last_scammer_msg:
+        if not last_scammer_text:
             return self._get_random_response()
         
+        last_scammer_msg = last_scammer_text.lower()
+        
         # Update memory with what we've extracted
         if extracted.upiIds:
             self.memory.mark_extracted("upi")
@@ -156,31 +212,31 @@ class AutonomousAgent:
         msg_lower = scammer_msg.lower()
         
         # If scammer mentions UPI, try to extract
-        if "upi" in msg_lower or "paytm" in msg_lower or "phonepe" in msg_lower:
+        if UPI_TRIGGERS.search(msg_lower):
             if not extracted.upiIds and self.memory.extraction_attempts["upi"] < 2:
                 return "extract_upi"
         
         # If scammer mentions bank/account
-        if "bank" in msg_lower or "account" in msg_lower or "transfer" in msg_lower:
+        if BANK_TRIGGERS.search(msg_lower):
             if not extracted.bankAccounts and self.memory.extraction_attempts["bank"] < 2:
                 return "extract_bank"
         
         # If scammer mentions phone/call
-        if "call" in msg_lower or "phone" in msg_lower or "contact" in msg_lower:
+        if PHONE_TRIGGERS.search(msg_lower):
             if not extracted.phoneNumbers and self.memory.extraction_attempts["phone"] < 2:
                 return "extract_phone"
         
         # If scammer mentions link/click
-        if "click" in msg_lower or "link" in msg_lower or "website" in msg_lower:
+        if LINK_TRIGGERS.search(msg_lower):
             if not extracted.phishingLinks and self.memory.extraction_attempts["link"] < 2:
                 return "extract_link"
         
         # If scammer is being pushy/urgent
-        if any(word in msg_lower for word in ["hurry", "quick", "now", "urgent", "immediately"]):
+        if URGENCY_TRIGGERS.search(msg_lower):
             return "express_concern"
         
         # If asking for sensitive info
-        if any(word in msg_lower for word in ["send", "share", "provide", "give"]):
+        if REQUEST_TRIGGERS.search(msg_lower):
             return "express_confusion"
         
         # Early turns - ask clarification
@@ -192,18 +248,10 @@ class AutonomousAgent:
     
     def _generate_extraction_question(self, data_type: str) -> str:
         """Generate question to extract specific data"""
-        questions = EXTRACTION_QUESTIONS.get(data_type, ["Can you tell me more?"])
-        question = random.choice(questions)
-        
-        # Add persona flavor
-        if self.persona["name"] == "Ramesh":  # Confused elderly
-            question += " I want to make sure I do it correctly."
-        elif self.persona["name"] == "Priya":  # Cooperative
-            question += " I want to help."
-        elif self.persona["name"] == "Vikram":  # Skeptical
-            question += " I need to verify this first."
-        
-        return question
+        questions = self._extraction_questions.get(data_type)
+        if not questions:
+            return "Can you tell me more?" + PERSONA_SUFFIX.get(self.persona["name"], "")
+        return self._rng.choice(questions)
     
     def _generate_confusion_response(self, scammer_msg: str) -> str:
         """Generate confusion response"""
@@ -214,7 +262,7 @@ class AutonomousAgent:
             "I'm not sure I follow. Can you break it down?",
             "Wait... I'm lost. What are you asking for?",
         ]
-        return random.choice(responses)
+        return self._rng.choice(responses)
     
     def _generate_clarification_question(self, scammer_msg: str) -> str:
         """Generate clarification question"""
@@ -225,7 +273,7 @@ class AutonomousAgent:
             "Can you tell me more about why this is urgent?",
             "What will happen if I don't do this?",
         ]
-        return random.choice(responses)
+        return self._rng.choice(responses)
     
     def _generate_cooperative_response(self) -> str:
         """Generate cooperative response"""
@@ -236,7 +284,7 @@ class AutonomousAgent:
             "I'm ready. What do I need to do?",
             "Okay, I'm following along. Please continue.",
         ]
-        return random.choice(responses)
+        return self._rng.choice(responses)
     
     def _generate_concern_response(self) -> str:
         """Generate concerned response"""
@@ -247,11 +295,11 @@ class AutonomousAgent:
             "I need to think about this. Is there a deadline?",
             "I'm concerned. Can I verify this with my bank first?",
         ]
-        return random.choice(responses)
+        return self._rng.choice(responses)
     
     def _get_random_response(self) -> str:
         """Get random response from persona"""
-        return random.choice(self.persona["responses"])
+        return self._rng.choice(self.persona["responses"])
     
     def should_continue(self) -> bool:
         """Check if agent should continue engagement"""
@@ -261,7 +309,7 @@ class AutonomousAgent:
     
     def get_engagement_duration(self) -> float:
         """Get engagement duration in seconds"""
-        return (datetime.utcnow() - self.start_time).total_seconds()
+        return time.time() - self.start_time
     
     def generate_agent_notes(self, extracted: ExtractedIntelligence) -> str:
         """Generate summary notes about the scam"""
@@ -284,6 +332,11 @@ class AutonomousAgent:
         if tactics:
             notes_parts.append(f"Used {' and '.join(tactics)}.")
         
+        # Why the links look malicious (deduplicated, first seen first)
+        red_flags = dict.fromkeys(flag for link in extracted.phishingLinks for flag in url_red_flags(link))
+        if red_flags:
+            notes_parts.append(f"Links flagged for: {', '.join(red_flags)}.")
+        
         # Intelligence extracted
         intel_summary = extracted.get_summary()
         if intel_summary != "No actionable intelligence":
@@ -293,6 +346,72 @@ class AutonomousAgent:
         notes_parts.append(f"Engaged for {self.turn_count} turns.")
         
         return " ".join(notes_parts)
+    
+    def to_state(self) -> Dict[str, str]:
+        """Serialize agent state as a flat Redis hash"""
+        return {
+            "memory": json.dumps(self.memory.to_dict()),
+            "persona": self.persona["name"],
+            "turns": str(self.turn_count),
+            "scam_type": self.scam_type.value,
+            "start_time": repr(self.start_time),
+        }
+    
+    @classmethod
+    def from_state(cls, session_id: str, state: Dict[str, str]) -> "AutonomousAgent":
+        """Rebuild agent from persisted hash"""
+        agent = cls(
+            session_id,
+            ScamType(state.get("scam_type", "unknown")),
+            persona=PERSONAS_BY_NAME.get(state.get("persona"))
+        )
+        agent.memory = ConversationMemory.from_dict(json.loads(state.get("memory", "{}")))
+        agent.turn_count = int(state.get("turns", 0))
+        if state.get("start_time"):
+            agent.start_time = float(state["start_time"])
+        return agent
+    
+    async def persist(self):
+        """
+        Save agent state so any worker can resume this session
+        
+        Uses Redis hash honeypot:agent:{session_id} with TTL when configured,
+        otherwise keeps the agent in process memory.
+        """
+        client = get_redis()
+        if client is None:
+            if self.session_id in _local_agents:
+                _local_agents.move_to_end(self.session_id)
+            elif len(_local_agents) >= settings.MAX_ACTIVE_AGENTS:
+                _local_agents.popitem(last=False)
+            _local_agents[self.session_id] = self
+            return
+        
+        key = AGENT_KEY_PREFIX + self.session_id
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=self.to_state())
+            pipe.expire(key, settings.SESSION_TTL_SECONDS)
+            await pipe.execute()
+    
+    @classmethod
+    async def load(cls, session_id: str) -> Optional["AutonomousAgent"]:
+        """Load agent for session, or None if no state exists"""
+        client = get_redis()
+        if client is None:
+            agent = _local_agents.get(session_id)
+            if agent is not None:
+                _local_agents.move_to_end(session_id)
+            return agent
+        
+        state = await client.hgetall(AGENT_KEY_PREFIX + session_id)
+        if not state:
+            return None
+        return cls.from_state(session_id, state)
+    
+    @staticmethod
+    def release(session_id: str):
+        """Drop the in-process agent once its session is reported (Redis state expires via TTL)"""
+        _local_agents.pop(session_id, None)
 
 
 def create_agent(session_id: str, scam_type: ScamType) -> AutonomousAgent:
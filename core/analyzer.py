@@ -0,0 +1,50 @@
+"""
+GUVI Agentic Scam HoneyPot - Message Analyzer
+Single incremental pass for scam detection and intelligence extraction
+"""
+
+from typing import List, Optional, Tuple
+
+from core.models import Message, ScamDetectionResult, ExtractedIntelligence
+from core.detector import detector
+from core.extractor import extractor
+
+
+def analyze_messages(new_messages: List[Message],
+                     prior_detection: Optional[ScamDetectionResult] = None,
+                     prior_intel: Optional[ExtractedIntelligence] = None
+                     ) -> Tuple[ScamDetectionResult, ExtractedIntelligence]:
+    """
+    Detect scam intent and extract intelligence from messages not yet analyzed
+    
+    Each new message is scanned once for both detection patterns and (for
+    scammer messages) extraction patterns. Matches are merged with the prior
+    results, so per-request work is proportional to the new messages only.
+    
+    Args:
+        new_messages: Messages added since prior_detection was computed
+        prior_detection: Previous detection result for the session
+        prior_intel: Intelligence extracted so far
+    
+    Returns:
+        (detection result covering all messages, merged intelligence)
+    """
+    category_matches = {}
+    analyzed = 0
+    if prior_detection:
+        category_matches = {k: list(v) for k, v in prior_detection.categoryMatches.items()}
+        analyzed = prior_detection.messagesAnalyzed
+    
+    intel = prior_intel
+    
+    for message in new_messages:
+        detector.scan(message.text_lower, category_matches)
+        intel = extractor.extract_incremental(message, intel)
+    
+    if intel is None:
+        intel = ExtractedIntelligence()
+    
+    detection = detector.score(category_matches)
+    detection.messagesAnalyzed = analyzed + len(new_messages)
+    
+    return detection, intel
@@ -3,12 +3,35 @@ GUVI Agentic Scam HoneyPot - Callback Module
 Sends final results to GUVI endpoint (MANDATORY)
 """
 
+import json
+import heapq
+import itertools
+import logging
+import time
 import httpx
 import asyncio
-from typing import Optional
+from typing import List, Optional, Set, Tuple
 
 from core.models import SessionState, GUVICallbackPayload
 from core.config import settings
+from core.redis_client import get_redis
+from core.database import mark_callback_sent
+
+
+# Redis sorted set of payloads awaiting redelivery, scored by due time (epoch seconds)
+CALLBACK_RETRY_KEY = "honeypot:callback:retry:due"
+
+# Per-session in-flight marker (Redis string, SET NX) so only one worker delivers a callback
+CALLBACK_INFLIGHT_KEY_PREFIX = "honeypot:callback:inflight:"
+
+# Marker lifetime; refreshed on every retry, and kept after delivery so turns that
+# loaded the session before callback_sent was saved don't schedule it again
+CALLBACK_INFLIGHT_TTL_SECONDS = 300
+
+# Longest the retry worker sleeps before checking for due payloads again
+RETRY_POLL_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
 
 
 class GUVICallback:
@@ -20,7 +43,40 @@ class GUVICallback:
     
     def __init__(self):
         self.callback_url = settings.GUVI_CALLBACK_URL
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending: Set[asyncio.Task] = set()
+        # In-flight markers without Redis (with Redis they live under CALLBACK_INFLIGHT_KEY_PREFIX)
+        self._in_flight: Set[str] = set()
+        # Without Redis: heap of (due time, seq, payload, attempts); kept across worker restarts
+        self._local_retry: List[Tuple[float, int, GUVICallbackPayload, int]] = []
+        self._retry_seq = itertools.count()
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared pooled HTTP/2 client (recreated if closed on a previous shutdown)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=3.0),
+                http2=True,
+                limits=httpx.Limits(
+                    max_keepalive_connections=100,
+                    max_connections=200,
+                    keepalive_expiry=60.0
+                )
+            )
+        return self._client
+    
+    def _build_payload(self, session: SessionState) -> GUVICallbackPayload:
+        """Build callback payload from session state"""
+        return GUVICallbackPayload(
+            sessionId=session.sessionId,
+            scamDetected=session.detectionResult.scamDetected if session.detectionResult else False,
+            totalMessagesExchanged=session.engagementMetrics.totalMessagesExchanged,
+            extractedIntelligence=session.extractedIntelligence,
+            agentNotes=session.agentNotes
+        )
     
     async def send_callback(self, session: SessionState) -> bool:
         """
@@ -33,47 +89,226 @@ class GUVICallback:
             True if callback was successful
         """
         try:
-            # Build callback payload
-            payload = GUVICallbackPayload(
-                sessionId=session.sessionId,
-                scamDetected=session.detectionResult.scamDetected if session.detectionResult else False,
-                totalMessagesExchanged=session.engagementMetrics.totalMessagesExchanged,
-                extractedIntelligence=session.extractedIntelligence,
-                agentNotes=session.agentNotes
-            )
-            
-            print(f"[CALLBACK] Sending results for session {session.sessionId}")
-            print(f"[CALLBACK] URL: {self.callback_url}")
-            print(f"[CALLBACK] Payload: {payload.model_dump_json(indent=2)}")
+            payload = self._build_payload(session)
+        except Exception as e:
+            logger.error("[CALLBACK] ❌ Error: %s", e)
+            return False
+        
+        return await self._post(payload)
+    
+    async def _post(self, payload: GUVICallbackPayload) -> bool:
+        """POST payload to GUVI endpoint"""
+        try:
+            logger.info("[CALLBACK] Sending results for session %s", payload.sessionId)
+            logger.info("[CALLBACK] URL: %s", self.callback_url)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[CALLBACK] Payload: %s", payload.model_dump_json(indent=2))
             
-            # Send POST request to GUVI endpoint
+            # Send POST request to GUVI endpoint (serialized once by pydantic-core)
             response = await self.client.post(
                 self.callback_url,
-                json=payload.model_dump(),
+                content=payload.model_dump_json(),
                 headers={
                     "Content-Type": "application/json"
                 }
             )
             
-            if response.status_code == 200:
-                print(f"[CALLBACK] ✅ Success! Status: {response.status_code}")
-                print(f"[CALLBACK] Response: {response.text}")
+            if response.is_success:
+                logger.info("[CALLBACK] ✅ Success! Status: %s", response.status_code)
+                logger.info("[CALLBACK] Response: %s", response.text)
                 return True
             else:
-                print(f"[CALLBACK] ❌ Failed! Status: {response.status_code}")
-                print(f"[CALLBACK] Response: {response.text}")
+                logger.warning("[CALLBACK] ❌ Failed! Status: %s", response.status_code)
+                logger.warning("[CALLBACK] Response: %s", response.text)
                 return False
                 
         except httpx.TimeoutException:
-            print(f"[CALLBACK] ❌ Timeout error")
+            logger.warning("[CALLBACK] ❌ Timeout error")
             return False
         except Exception as e:
-            print(f"[CALLBACK] ❌ Error: {e}")
+            logger.error("[CALLBACK] ❌ Error: %s", e)
             return False
     
+    async def _claim(self, session_id: str) -> bool:
+        """Take the in-flight marker for session (False if another delivery holds it)"""
+        client = get_redis()
+        if client is None:
+            if session_id in self._in_flight:
+                return False
+            self._in_flight.add(session_id)
+            return True
+        
+        return bool(await client.set(
+            CALLBACK_INFLIGHT_KEY_PREFIX + session_id, 1,
+            nx=True, ex=CALLBACK_INFLIGHT_TTL_SECONDS
+        ))
+    
+    async def _release(self, session_id: str):
+        """Drop the in-flight marker so a later turn can schedule the callback again"""
+        client = get_redis()
+        if client is None:
+            self._in_flight.discard(session_id)
+        else:
+            await client.delete(CALLBACK_INFLIGHT_KEY_PREFIX + session_id)
+    
+    def _hold(self, session_id: str):
+        """Keep the marker of a delivered session until it expires (Redis markers carry their own TTL)"""
+        if get_redis() is None:
+            asyncio.get_running_loop().call_later(
+                CALLBACK_INFLIGHT_TTL_SECONDS, self._in_flight.discard, session_id
+            )
+    
+    async def schedule(self, session: SessionState) -> bool:
+        """
+        Deliver callback in the background so the request is not blocked
+        
+        Failed deliveries are queued for the retry worker; the session is
+        marked callback_sent only once a delivery succeeds.
+        
+        Returns:
+            False if a callback for this session is already in flight
+        """
+        if not await self._claim(session.sessionId):
+            return False
+        
+        # Snapshot so later session mutations don't leak into the payload
+        payload = self._build_payload(session).model_copy(deep=True)
+        self._spawn(self._attempt(payload, attempts=0))
+        return True
+    
+    def _spawn(self, coro):
+        """Run a delivery attempt as a tracked background task"""
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def _attempt(self, payload: GUVICallbackPayload, attempts: int):
+        """
+        One delivery attempt (attempts = retries already made)
+        
+        On success the session is marked callback_sent; on failure the
+        payload is queued for redelivery after a backoff.
+        """
+        if attempts:
+            logger.info("[CALLBACK] Retry %d for session %s", attempts, payload.sessionId)
+        
+        try:
+            delivered = await self._post(payload)
+        except asyncio.CancelledError:
+            # Shutdown mid-POST: keep the payload for the next worker
+            await asyncio.shield(self._enqueue_retry(payload, attempts, delay=0.0))
+            raise
+        
+        if delivered:
+            await mark_callback_sent(payload.sessionId)
+            self._hold(payload.sessionId)
+        else:
+            await self._enqueue_retry(payload, attempts + 1)
+    
+    async def _enqueue_retry(self, payload: GUVICallbackPayload, attempts: int,
+                             delay: Optional[float] = None):
+        """Queue payload for redelivery once its backoff has elapsed (Redis or in-process)"""
+        if attempts > settings.CALLBACK_MAX_RETRIES:
+            logger.error("[CALLBACK] ❌ Giving up on session %s after %d retries", payload.sessionId, attempts - 1)
+            # callback_sent stays unset, so a later turn schedules it again
+            await self._release(payload.sessionId)
+            return
+        
+        if delay is None:
+            delay = min(2 ** attempts, 60)
+        due = time.time() + delay
+        
+        client = get_redis()
+        if client is None:
+            heapq.heappush(self._local_retry, (due, next(self._retry_seq), payload, attempts))
+            return
+        
+        item = json.dumps({"attempts": attempts, "payload": payload.model_dump()})
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zadd(CALLBACK_RETRY_KEY, {item: due})
+            pipe.expire(CALLBACK_INFLIGHT_KEY_PREFIX + payload.sessionId, CALLBACK_INFLIGHT_TTL_SECONDS)
+            await pipe.execute()
+    
+    async def _claim_due(self) -> Tuple[List[Tuple[GUVICallbackPayload, int]], float]:
+        """
+        Take every payload whose backoff has elapsed off the retry queue
+        
+        Returns:
+            (claimed (payload, attempts) pairs, seconds until the next one is due)
+        """
+        now = time.time()
+        claimed = []
+        
+        client = get_redis()
+        if client is None:
+            while self._local_retry and self._local_retry[0][0] <= now:
+                _, _, payload, attempts = heapq.heappop(self._local_retry)
+                claimed.append((payload, attempts))
+            next_due = self._local_retry[0][0] if self._local_retry else None
+        else:
+            for item in await client.zrangebyscore(CALLBACK_RETRY_KEY, "-inf", now):
+                # ZREM decides which worker owns an item when several poll the same set
+                if await client.zrem(CALLBACK_RETRY_KEY, item):
+                    data = json.loads(item)
+                    # Re-take the marker in case it lapsed while the payload waited (e.g. across a restart)
+                    await client.set(
+                        CALLBACK_INFLIGHT_KEY_PREFIX + data["payload"]["sessionId"], 1,
+                        ex=CALLBACK_INFLIGHT_TTL_SECONDS
+                    )
+                    claimed.append((GUVICallbackPayload(**data["payload"]), data["attempts"]))
+            upcoming = await client.zrange(CALLBACK_RETRY_KEY, 0, 0, withscores=True)
+            next_due = upcoming[0][1] if upcoming else None
+        
+        wait = RETRY_POLL_SECONDS if next_due is None else next_due - now
+        return claimed, min(max(wait, 0.0), RETRY_POLL_SECONDS)
+    
+    async def _retry_loop(self):
+        """Redeliver failed callbacks once due; each retry runs as its own task"""
+        # Stopped via _stopping rather than cancel(), so a claim is never cut off midway
+        while not self._stopping.is_set():
+            try:
+                claimed, wait = await self._claim_due()
+                for payload, attempts in claimed:
+                    self._spawn(self._attempt(payload, attempts))
+                
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("[CALLBACK] ❌ Retry worker error: %s", e)
+                await asyncio.sleep(1)
+    
+    def start_retry_worker(self):
+        """Start background retry worker"""
+        if self._worker is None:
+            self._stopping = asyncio.Event()
+            self._worker = asyncio.create_task(self._retry_loop())
+    
+    async def stop_retry_worker(self):
+        """
+        Stop retry worker, letting in-flight deliveries finish
+        
+        Payloads still waiting out their backoff stay queued (in Redis, or
+        in-process for the next start_retry_worker).
+        """
+        if self._worker is not None:
+            self._stopping.set()
+            await self._worker
+            self._worker = None
+            self._stopping = None
+        
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+    
     async def close(self):
         """Close HTTP client"""
-        await self.client.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
 
 # Singleton instance
@@ -87,3 +322,23 @@ async def send_guvi_callback(session: SessionState) -> bool:
     This is MANDATORY for evaluation - do not skip!
     """
     return await callback_client.send_callback(session)
+
+
+async def schedule_guvi_callback(session: SessionState) -> bool:
+    """Send GUVI callback in the background with retries (False if already in flight)"""
+    return await callback_client.schedule(session)
+
+
+def start_callback_worker():
+    """Start background worker that retries failed callbacks"""
+    callback_client.start_retry_worker()
+
+
+async def stop_callback_worker():
+    """Stop retry worker on shutdown"""
+    await callback_client.stop_retry_worker()
+
+
+async def close_callback_client():
+    """Close pooled HTTP client on shutdown"""
+    await callback_client.close()
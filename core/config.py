@@ -2,6 +2,8 @@
 GUVI Agentic Scam HoneyPot - Configuration
 """
 
+import re
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from typing import List, Optional
@@ -27,6 +29,7 @@ class Settings(BaseSettings):
         default="https://hackathon.guvi.in/api/updateHoneyPotFinalResult",
         env="GUVI_CALLBACK_URL"
     )
+    CALLBACK_MAX_RETRIES: int = Field(default=5, env="CALLBACK_MAX_RETRIES")
     
     # Scam Detection
     SCAM_DETECTION_THRESHOLD: float = Field(default=0.6, env="SCAM_DETECTION_THRESHOLD")
@@ -34,10 +37,15 @@ class Settings(BaseSettings):
     # Agent Settings
     MAX_CONVERSATION_TURNS: int = Field(default=15, env="MAX_CONVERSATION_TURNS")
     MIN_TURNS_BEFORE_CALLBACK: int = 3  # Minimum turns before sending callback
+    MAX_ACTIVE_AGENTS: int = Field(default=1000, env="MAX_ACTIVE_AGENTS")  # In-process agent cap (no Redis)
     
     # Database
     DATABASE_URL: str = Field(default="sqlite:///./guvi_honeypot.db", env="DATABASE_URL")
     
+    # Redis - shared agent state across workers (in-process when unset)
+    REDIS_URL: Optional[str] = Field(default=None, env="REDIS_URL")
+    SESSION_TTL_SECONDS: int = Field(default=3600, env="SESSION_TTL_SECONDS")  # Inactivity before eviction
+    
     # Logging
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     
@@ -89,7 +97,9 @@ SCAM_PATTERNS = {
     "phishing": [
         r"click\s*(here|link)",
         r"tap\s*here",
-        r"http[s]?://[^\s]+(?:verify|secure|login|update|kyc)",
+        # One start per URL token; the lookbehind only rejects URL-internal characters,
+        # so "Link:https://..." and "(http://...)" still match
+        r"(?<![\w/.-])https?://\S*(?:verify|secure|login|update|kyc)",
         r"bit\.ly|tinyurl|t\.co|short\.link",
         r"verify\s*(?:account|identity|details)",
         r"update\s*(?:kyc|details|information)",
@@ -134,36 +144,34 @@ SCAM_PATTERNS = {
 
 # Extraction Patterns
 EXTRACTION_PATTERNS = {
+    # Patterns encode their own length/format rules; "validate" is only
+    # given where a match still needs checking
     "bank_account": {
         "regex": [
             r"\b\d{9,18}\b",
-            r"(?:account|a/c)\s*(?:number|no)?[:\s]+(\d+)",
-            r"(?:account|a/c)[:\s]+(\d{9,18})",
+            r"(?:account|a/c)\s*(?:number|no)?[:\s]+(\d{9,18})(?!\d)",
         ],
-        "validate": lambda x: 9 <= len(''.join(c for c in x if c.isdigit())) <= 18
     },
     "ifsc_code": {
         "regex": [
             r"\b[A-Z]{4}0[A-Z0-9]{6}\b",
             r"ifsc[:\s]+([A-Z]{4}0[A-Z0-9]{6})",
         ],
-        "validate": lambda x: len(x) == 11 and x[4] == '0'
     },
     "upi_id": {
         "regex": [
-            r"\b[\w.-]+@(?:paytm|phonepe|ybl|oksbi|okhdfcbank|okicici|okaxis|ibl|axl)\b",
-            r"\b[\w.-]+@[\w]+\b",
-            r"upi\s*(?:id)?[:\s]+([\w.-]+@[\w]+)",
+            # Lookbehind allows one start per run of [\w.-] (linear on long dotted runs)
+            r"(?<![\w.-])[.-]*(\w[\w.-]{2,}@(?:paytm|phonepe|ybl|oksbi|okhdfcbank|okicici|okaxis|ibl|axl))\b",
+            r"(?<![\w.-])[.-]*(\w[\w.-]{2,}@\w+)\b",
+            r"upi\s*(?:id)?[:\s]+([\w.-]{3,}@\w+)",
         ],
-        "validate": lambda x: '@' in x and len(x.split('@')[0]) >= 3
     },
     "phone_number": {
         "regex": [
             r"\+91[-\s]?\d{10}",
-            r"\b\d{10}\b",
-            r"(?:mobile|phone|contact|call)[:\s]+(\+?\d[\d\s-]{8,})",
+            r"\b[6-9]\d{9}\b",  # Indian mobile numbers start with 6-9
+            r"(?:mobile|phone|contact|call)[:\s]+(\+?\d(?:[\s-]?\d){9,14})",  # 10-15 digits
         ],
-        "validate": lambda x: len(''.join(c for c in x if c.isdigit())) >= 10
     },
     "phishing_link": {
         "regex": [
@@ -175,6 +183,21 @@ EXTRACTION_PATTERNS = {
 }
 
 
+# Compiled once at import and shared by the detector and extractor
+COMPILED_SCAM_PATTERNS = {
+    category: [re.compile(p, re.IGNORECASE) for p in patterns]
+    for category, patterns in SCAM_PATTERNS.items()
+}
+
+COMPILED_EXTRACTION_PATTERNS = {
+    name: {
+        "regex": [re.compile(p, re.IGNORECASE) for p in spec["regex"]],
+        "validate": spec.get("validate"),
+    }
+    for name, spec in EXTRACTION_PATTERNS.items()
+}
+
+
 # Agent Personas
 PERSONAS = {
     "confused": {
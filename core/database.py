@@ -3,15 +3,84 @@ GUVI Agentic Scam HoneyPot - Database Layer
 Session storage and retrieval
 """
 
-import json
+import functools
+import logging
+import orjson
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional, Dict, List
 from pathlib import Path
 import asyncio
 
-from core.models import SessionState, Message, ScamDetectionResult, ExtractedIntelligence, EngagementMetrics
+from core.models import SessionState, ScamDetectionResult, ExtractedIntelligence, EngagementMetrics
 from core.config import settings
+from core.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+# Redis key prefix: hash {prefix}{sid} for fields, list {prefix}{sid}:msgs for messages
+SESSION_KEY_PREFIX = "honeypot:session:"
+
+# sessions table columns, in schema order
+SESSION_COLUMNS = [
+    "session_id", "created_at", "updated_at", "is_active", "callback_sent",
+    "messages", "detection_result", "extracted_intelligence", 
+    "engagement_metrics", "agent_notes"
+]
+
+# Worker threads for SQLite calls; each keeps one persistent connection
+DB_EXECUTOR_WORKERS = 4
+
+# Fixed statement text so each connection's statement cache reuses the prepared plan.
+# callback_sent only ever goes 0 -> 1: delivery sets it behind the request's back,
+# so a save of a session loaded before that must not clear it
+UPSERT_SESSION_SQL = '''
+    INSERT INTO sessions 
+    (session_id, created_at, updated_at, is_active, callback_sent,
+     messages, detection_result, extracted_intelligence, 
+     engagement_metrics, agent_notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(session_id) DO UPDATE SET
+        updated_at = excluded.updated_at,
+        is_active = excluded.is_active,
+        callback_sent = MAX(callback_sent, excluded.callback_sent),
+        messages = excluded.messages,
+        detection_result = excluded.detection_result,
+        extracted_intelligence = excluded.extracted_intelligence,
+        engagement_metrics = excluded.engagement_metrics,
+        agent_notes = excluded.agent_notes
+'''
+SELECT_SESSION_SQL = "SELECT {} FROM sessions WHERE session_id = ?".format(", ".join(SESSION_COLUMNS))
+# Same row shape with NULL in place of the messages column
+SELECT_SESSION_NO_MESSAGES_SQL = "SELECT {} FROM sessions WHERE session_id = ?".format(
+    ", ".join("NULL" if c == "messages" else c for c in SESSION_COLUMNS)
+)
+MARK_CALLBACK_SENT_SQL = "UPDATE sessions SET callback_sent = 1 WHERE session_id = ?"
+
+
+def _db_op(failed=None):
+    """
+    Decorate a Database method to log SQLite errors and return `failed`
+    
+    Only sqlite3.Error is caught; anything else is a bug and propagates.
+    The thread's connection is rolled back so it isn't reused mid-transaction.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return fn(self, *args, **kwargs)
+            except sqlite3.Error:
+                conn = getattr(self._local, "conn", None)
+                if conn is not None:
+                    conn.rollback()
+                logger.exception("db op %s failed", fn.__name__)
+                return failed
+        return wrapper
+    return decorator
 
 
 class Database:
@@ -20,11 +89,15 @@ class Database:
     def __init__(self, db_path: str = None):
         self.db_path = db_path or settings.DATABASE_URL.replace("sqlite:///", "")
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.executor = ThreadPoolExecutor(
+            max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="sqlite"
+        )
         self._init_db()
     
     def _init_db(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         # Sessions table
@@ -35,7 +108,7 @@ class Database:
                 updated_at TEXT,
                 is_active INTEGER DEFAULT 1,
                 callback_sent INTEGER DEFAULT 0,
-                messages TEXT,
+                messages BLOB,
                 detection_result TEXT,
                 extracted_intelligence TEXT,
                 engagement_metrics TEXT,
@@ -43,194 +116,399 @@ class Database:
             )
         ''')
         
+        # Sessions still awaiting a callback, without scanning the JSON-heavy rows
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_active_callback
+            ON sessions(is_active, callback_sent) WHERE is_active = 1
+        ''')
+        
+        # Time-based cleanup of stale sessions
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_updated ON sessions(updated_at)")
+        
         conn.commit()
-        conn.close()
     
     def _get_conn(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_path)
+        """
+        Get this thread's persistent database connection
+        
+        Opened once per thread in WAL mode, so readers don't block on writers
+        and commits skip the rollback-journal fsync.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+            # Larger pages fit the wide JSON rows (only applies to a new database)
+            conn.execute("PRAGMA page_size=8192")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+            conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+            self._local.conn = conn
+            self._local.cursor = conn.cursor()
+        return conn
+    
+    def _get_cursor(self):
+        """Get this thread's reusable cursor (opening the connection if needed)"""
+        self._get_conn()
+        return self._local.cursor
+    
+    def session_row(self, session: SessionState) -> tuple:
+        """Serialize session into a row tuple in SESSION_COLUMNS order"""
+        # Columnar layout: key names stored once, not per message.
+        # orjson bytes go straight into the BLOB column (no str round trip)
+        messages = session.messages
+        messages_json = orjson.dumps({
+            "s": [m.sender for m in messages],
+            "t": [m.text for m in messages],
+            "ts": [m.timestamp for m in messages],
+        })
+        
+        # Models serialize straight to JSON in pydantic-core (no intermediate dict)
+        return (
+            session.sessionId,
+            session.createdAt.isoformat(),
+            session.updatedAt.isoformat(),
+            int(session.isActive),
+            int(session.callbackSent),
+            messages_json,
+            session.detectionResult.model_dump_json() if session.detectionResult else "{}",
+            session.extractedIntelligence.model_dump_json(),
+            session.engagementMetrics.model_dump_json(),
+            session.agentNotes
+        )
     
     def save_session(self, session: SessionState) -> bool:
         """Save or update session"""
+        return self.write_rows([self.session_row(session)])
+    
+    @_db_op(failed=False)
+    def write_rows(self, rows: List[tuple]) -> bool:
+        """Upsert session rows in a single transaction"""
+        conn = self._get_conn()
+        
+        # Insert, or update everything but created_at if it exists
+        self._get_cursor().executemany(UPSERT_SESSION_SQL, rows)
+        
+        conn.commit()
+        return True
+    
+    def atomic_finalize(self, session: SessionState, mark_sent: bool = True) -> bool:
+        """Save session and set callback_sent in one transaction"""
+        if mark_sent:
+            session.callbackSent = True
+        return self.save_session(session)
+    
+    @_db_op()
+    def get_session(self, session_id: str, include_messages: bool = True) -> Optional[SessionState]:
+        """
+        Get session by ID
+        
+        With include_messages=False the messages column is not read or decoded;
+        the returned session is for reading only and must not be saved back.
+        """
+        cursor = self._get_cursor()
+        sql = SELECT_SESSION_SQL if include_messages else SELECT_SESSION_NO_MESSAGES_SQL
+        cursor.execute(sql, (session_id,))
+        row = cursor.fetchone()
+        
+        if not row:
+            return None
+        
+        return self._row_to_session(row)
+    
+    def _row_to_session(self, row) -> SessionState:
+        """Convert database row to SessionState"""
+        data = dict(zip(SESSION_COLUMNS, row))
+        msg_list = []
+        if data.get("messages"):
+            stored = orjson.loads(data["messages"])
+            if isinstance(stored, dict):
+                msg_list = [
+                    {"sender": sender, "text": text, "timestamp": timestamp}
+                    for sender, text, timestamp in zip(stored["s"], stored["t"], stored["ts"])
+                ]
+            else:
+                msg_list = stored  # Rows written before the columnar layout
+        return _build_session(data, msg_list)
+    
+    @_db_op(failed=False)
+    def mark_callback_sent(self, session_id: str) -> bool:
+        """Mark session as callback sent"""
+        conn = self._get_conn()
+        self._get_cursor().execute(MARK_CALLBACK_SENT_SQL, (session_id,))
+        conn.commit()
+        return True
+
+
+def _build_session(data: dict, msg_list: List[dict]) -> SessionState:
+    """Build SessionState from stored fields and decoded message dicts"""
+    # Count senders up front; the message dicts go to pydantic-core as-is
+    scammer_count = 0
+    agent_count = 0
+    for m in msg_list:
+        if m["sender"] == "scammer":
+            scammer_count += 1
+        elif m["sender"] == "agent":
+            agent_count += 1
+    
+    # Parse and validate stored JSON in one step (pydantic-core, no separate loads)
+    detection = None
+    if data.get("detection_result") and data["detection_result"] != "{}":
+        detection = ScamDetectionResult.model_validate_json(data["detection_result"])
+    
+    intel = ExtractedIntelligence()
+    if data.get("extracted_intelligence"):
+        intel = ExtractedIntelligence.model_validate_json(data["extracted_intelligence"])
+    
+    metrics = EngagementMetrics()
+    if data.get("engagement_metrics"):
+        metrics = EngagementMetrics.model_validate_json(data["engagement_metrics"])
+    
+    # One validation call builds the session and its Message objects in
+    # pydantic-core (faster here than per-message construction or model_construct)
+    return SessionState.model_validate({
+        "sessionId": data["session_id"],
+        "createdAt": datetime.fromisoformat(data["created_at"]),
+        "updatedAt": datetime.fromisoformat(data["updated_at"]),
+        "messages": msg_list,
+        "scammerMessageCount": scammer_count,
+        "agentMessageCount": agent_count,
+        "detectionResult": detection,
+        "extractedIntelligence": intel,
+        "engagementMetrics": metrics,
+        "isActive": bool(int(data.get("is_active", 1))),
+        "callbackSent": bool(int(data.get("callback_sent", 0))),
+        "agentNotes": data.get("agent_notes", "")
+    })
+
+
+class RedisDatabase:
+    """
+    Redis session storage shared across workers
+    
+    Scalar fields live in a hash; messages in an append-only list so each
+    save only pushes messages added since the session was loaded.
+    """
+    
+    async def save_session(self, session: SessionState, transaction: bool = False) -> bool:
+        """Save session, pushing only new messages"""
         try:
-            conn = self._get_conn()
-            cursor = conn.cursor()
+            client = get_redis()
+            key = SESSION_KEY_PREFIX + session.sessionId
+            msgs_key = key + ":msgs"
+            new_messages = session.messages[session._persisted_message_count:]
             
-            # Serialize data
-            messages_json = json.dumps([
-                {"sender": m.sender, "text": m.text, "timestamp": m.timestamp}
-                for m in session.messages
-            ])
+            async with client.pipeline(transaction=transaction) as pipe:
+                pipe.hset(key, mapping={
+                    "created_at": session.createdAt.isoformat(),
+                    "updated_at": session.updatedAt.isoformat(),
+                    "is_active": int(session.isActive),
+                    "detection_result": session.detectionResult.model_dump_json() if session.detectionResult else "{}",
+                    "extracted_intelligence": session.extractedIntelligence.model_dump_json(),
+                    "engagement_metrics": session.engagementMetrics.model_dump_json(),
+                    "agent_notes": session.agentNotes,
+                })
+                # Only ever set, never cleared (see UPSERT_SESSION_SQL)
+                if session.callbackSent:
+                    pipe.hset(key, "callback_sent", 1)
+                if new_messages:
+                    pipe.rpush(msgs_key, *[
+                        orjson.dumps({"sender": m.sender, "text": m.text, "timestamp": m.timestamp})
+                        for m in new_messages
+                    ])
+                pipe.expire(key, settings.SESSION_TTL_SECONDS)
+                pipe.expire(msgs_key, settings.SESSION_TTL_SECONDS)
+                await pipe.execute()
             
-            detection_json = json.dumps(session.detection_result.model_dump()) if session.detectionResult else "{}"
-            intel_json = json.dumps(session.extractedIntelligence.model_dump())
-            metrics_json = json.dumps(session.engagementMetrics.model_dump())
-            
-            # Check if exists
-            cursor.execute("SELECT session_id FROM sessions WHERE session_id = ?", (session.sessionId,))
-            exists = cursor.fetchone()
-            
-            if exists:
-                # Update
-                cursor.execute('''
-                    UPDATE sessions SET
-                        updated_at = ?,
-                        is_active = ?,
-                        callback_sent = ?,
-                        messages = ?,
-                        detection_result = ?,
-                        extracted_intelligence = ?,
-                        engagement_metrics = ?,
-                        agent_notes = ?
-                    WHERE session_id = ?
-                ''', (
-                    session.updatedAt.isoformat(),
-                    int(session.isActive),
-                    int(session.callbackSent),
-                    messages_json,
-                    detection_json,
-                    intel_json,
-                    metrics_json,
-                    session.agentNotes,
-                    session.sessionId
-                ))
-            else:
-                # Insert
-                cursor.execute('''
-                    INSERT INTO sessions 
-                    (session_id, created_at, updated_at, is_active, callback_sent,
-                     messages, detection_result, extracted_intelligence, 
-                     engagement_metrics, agent_notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    session.sessionId,
-                    session.createdAt.isoformat(),
-                    session.updatedAt.isoformat(),
-                    int(session.isActive),
-                    int(session.callbackSent),
-                    messages_json,
-                    detection_json,
-                    intel_json,
-                    metrics_json,
-                    session.agentNotes
-                ))
-            
-            conn.commit()
-            conn.close()
+            session._persisted_message_count = len(session.messages)
             return True
             
-        except Exception as e:
-            print(f"Database error: {e}")
+        except Exception:
+            logger.exception("redis op save_session failed")
             return False
     
-    def get_session(self, session_id: str) -> Optional[SessionState]:
-        """Get session by ID"""
+    async def atomic_finalize(self, session: SessionState, mark_sent: bool = True) -> bool:
+        """Save session and set callback_sent in one MULTI/EXEC"""
+        if mark_sent:
+            session.callbackSent = True
+        return await self.save_session(session, transaction=True)
+    
+    async def get_session(self, session_id: str, include_messages: bool = True) -> Optional[SessionState]:
+        """Get session by ID (see Database.get_session for include_messages)"""
         try:
-            conn = self._get_conn()
-            cursor = conn.cursor()
+            client = get_redis()
+            key = SESSION_KEY_PREFIX + session_id
             
-            cursor.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,))
-            row = cursor.fetchone()
-            conn.close()
+            if include_messages:
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.hgetall(key)
+                    pipe.lrange(key + ":msgs", 0, -1)
+                    data, raw_messages = await pipe.execute()
+            else:
+                data, raw_messages = await client.hgetall(key), []
             
-            if not row:
+            if not data:
                 return None
             
-            return self._row_to_session(row)
+            data["session_id"] = session_id
+            session = _build_session(data, [orjson.loads(m) for m in raw_messages])
+            session._persisted_message_count = len(session.messages)
+            return session
             
-        except Exception as e:
-            print(f"Database error: {e}")
+        except Exception:
+            logger.exception("redis op get_session failed")
             return None
     
-    def _row_to_session(self, row) -> SessionState:
-        """Convert database row to SessionState"""
-        columns = [
-            "session_id", "created_at", "updated_at", "is_active", "callback_sent",
-            "messages", "detection_result", "extracted_intelligence", 
-            "engagement_metrics", "agent_notes"
-        ]
-        data = dict(zip(columns, row))
-        
-        # Parse messages
-        messages = []
-        if data.get("messages"):
-            msg_list = json.loads(data["messages"])
-            for m in msg_list:
-                messages.append(Message(sender=m["sender"], text=m["text"], timestamp=m.get("timestamp")))
-        
-        # Parse detection result
-        detection = None
-        if data.get("detection_result") and data["detection_result"] != "{}":
-            det_data = json.loads(data["detection_result"])
-            from core.models import ScamType
-            detection = ScamDetectionResult(
-                scamDetected=det_data.get("scamDetected", False),
-                confidenceScore=det_data.get("confidenceScore", 0),
-                scamType=ScamType(det_data.get("scamType", "unknown")),
-                indicators=det_data.get("indicators", []),
-                reasoning=det_data.get("reasoning", "")
-            )
-        
-        # Parse intelligence
-        intel = ExtractedIntelligence()
-        if data.get("extracted_intelligence"):
-            intel_data = json.loads(data["extracted_intelligence"])
-            intel = ExtractedIntelligence(**intel_data)
-        
-        # Parse metrics
-        metrics = EngagementMetrics()
-        if data.get("engagement_metrics"):
-            met_data = json.loads(data["engagement_metrics"])
-            metrics = EngagementMetrics(**met_data)
-        
-        return SessionState(
-            sessionId=data["session_id"],
-            createdAt=datetime.fromisoformat(data["created_at"]),
-            updatedAt=datetime.fromisoformat(data["updated_at"]),
-            messages=messages,
-            detectionResult=detection,
-            extractedIntelligence=intel,
-            engagementMetrics=metrics,
-            isActive=bool(data.get("is_active", 1)),
-            callbackSent=bool(data.get("callback_sent", 0)),
-            agentNotes=data.get("agent_notes", "")
-        )
-    
-    def mark_callback_sent(self, session_id: str) -> bool:
+    async def mark_callback_sent(self, session_id: str) -> bool:
         """Mark session as callback sent"""
         try:
-            conn = self._get_conn()
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE sessions SET callback_sent = 1 WHERE session_id = ?",
-                (session_id,)
-            )
-            conn.commit()
-            conn.close()
+            await get_redis().hset(SESSION_KEY_PREFIX + session_id, "callback_sent", 1)
             return True
-        except Exception as e:
-            print(f"Database error: {e}")
+        except Exception:
+            logger.exception("redis op mark_callback_sent failed")
             return False
 
 
-# Singleton instance
+class SessionWriteBehind:
+    """
+    Write-behind buffer for SQLite session saves
+    
+    Saves are serialized and buffered per session (latest wins); a background
+    task flushes the buffer every FLUSH_INTERVAL_SECONDS with one executemany
+    and one commit. Buffered rows are served to get_session, so reads always
+    see the latest save.
+    """
+    
+    FLUSH_INTERVAL_SECONDS = 0.02
+    
+    def __init__(self, database: Database):
+        self.database = database
+        self._pending: Dict[str, tuple] = {}
+        self._flushing: Dict[str, tuple] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+    
+    def put(self, row: tuple):
+        """Buffer a row from Database.session_row"""
+        self._pending[row[0]] = row
+    
+    def get(self, session_id: str) -> Optional[tuple]:
+        """Latest buffered (not yet committed) row for session, if any"""
+        return self._pending.get(session_id) or self._flushing.get(session_id)
+    
+    async def flush(self):
+        """Write all buffered rows in one transaction"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            if not self._pending:
+                return
+            
+            self._flushing, self._pending = self._pending, {}
+            loop = asyncio.get_event_loop()
+            ok = await loop.run_in_executor(
+                self.database.executor, self.database.write_rows, list(self._flushing.values())
+            )
+            if not ok:
+                # Keep failed rows for the next flush unless superseded meanwhile
+                for session_id, row in self._flushing.items():
+                    self._pending.setdefault(session_id, row)
+            self._flushing = {}
+    
+    async def _flush_loop(self):
+        """Flush periodically until cancelled"""
+        while True:
+            try:
+                await asyncio.sleep(self.FLUSH_INTERVAL_SECONDS)
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("write-behind flush failed")
+    
+    def start(self):
+        """Start background flushing"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop background flushing and write anything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._lock = None
+
+
+# Singleton instances
 db = Database()
+redis_db = RedisDatabase()
+write_behind = SessionWriteBehind(db)
 
 
 # Async wrappers
 async def save_session(session: SessionState) -> bool:
     """Async wrapper for save_session"""
+    if get_redis() is not None:
+        return await redis_db.save_session(session)
+    if write_behind.running:
+        write_behind.put(db.session_row(session))
+        return True
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, db.save_session, session)
+    return await loop.run_in_executor(db.executor, db.save_session, session)
+
 
+async def atomic_finalize(session: SessionState, mark_sent: bool = True) -> bool:
+    """Async wrapper for atomic_finalize"""
+    if get_redis() is not None:
+        return await redis_db.atomic_finalize(session, mark_sent)
+    if write_behind.running:
+        # The whole row (flag included) is written in one transaction on flush
+        if mark_sent:
+            session.callbackSent = True
+        write_behind.put(db.session_row(session))
+        return True
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(db.executor, db.atomic_finalize, session, mark_sent)
 
-async def get_session(session_id: str) -> Optional[SessionState]:
+
+async def get_session(session_id: str, include_messages: bool = True) -> Optional[SessionState]:
     """Async wrapper for get_session"""
+    if get_redis() is not None:
+        return await redis_db.get_session(session_id, include_messages)
+    row = write_behind.get(session_id)
+    if row is not None:
+        return db._row_to_session(row)
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, db.get_session, session_id)
+    return await loop.run_in_executor(db.executor, db.get_session, session_id, include_messages)
 
 
 async def mark_callback_sent(session_id: str) -> bool:
     """Async wrapper for mark_callback_sent"""
+    if get_redis() is not None:
+        return await redis_db.mark_callback_sent(session_id)
+    # A buffered row would otherwise overwrite the flag when flushed
+    await write_behind.flush()
     loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, db.mark_callback_sent, session_id)
+    return await loop.run_in_executor(db.executor, db.mark_callback_sent, session_id)
+
+
+def start_db_writer():
+    """Start write-behind flushing for SQLite (Redis writes are not buffered)"""
+    if get_redis() is None:
+        write_behind.start()
+
+
+async def stop_db_writer():
+    """Flush buffered session writes on shutdown"""
+    await write_behind.stop()
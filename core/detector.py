@@ -4,11 +4,118 @@ Detects scam intent with confidence scoring
 """
 
 import re
-from typing import List, Tuple, Set
+import string
+from itertools import islice
+from typing import List, Optional, Tuple, Set
 from collections import Counter
 
 from core.models import ScamDetectionResult, ScamType, Message
-from core.config import SCAM_PATTERNS, settings
+from core.config import SCAM_PATTERNS, COMPILED_SCAM_PATTERNS, settings
+
+try:
+    import re2  # google-re2: optional single-pass multi-pattern scan
+except ImportError:
+    re2 = None
+
+
+# Every scam pattern needs at least one of its own letters/digits (or "@"/"₹",
+# or a \d digit) to match; text with none of these can't match and skips the scan
+SCAN_TRIGGER_CHARS = frozenset(
+    c for patterns in SCAM_PATTERNS.values() for p in patterns
+    for c in p.lower() if c.isalnum() or c in "@₹"
+) | frozenset(string.digits)
+
+# Same check for non-ASCII text, where re's Unicode \d (e.g. Devanagari digits) and
+# case folding (e.g. "ſ" for "s") can match characters outside SCAN_TRIGGER_CHARS
+SCAN_TRIGGER_PATTERN = re.compile(
+    "[" + "".join(re.escape(c) for c in sorted(SCAN_TRIGGER_CHARS)) + r"\d]", re.IGNORECASE
+)
+
+# RE2 treats \s, \d and \b as ASCII-only where re is Unicode-aware, and has no
+# lookbehind. Patterns go into the RE2 set widened to a superset of re's meaning
+# (\b and lookbehinds dropped), and each set hit is confirmed with re, so
+# results match the per-pattern re scan exactly
+RE2_SPACE_CLASS = r"\s\x{0b}\x{1c}-\x{1f}\x{85}\p{Z}"
+RE2_DIGIT_CLASS = r"\p{Nd}"
+
+
+def _re2_superset(pattern: str) -> str:
+    """Rewrite a re pattern for RE2 so it matches everything re would (and maybe more)"""
+    out = []
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escape = pattern[i:i + 2]
+            i += 2
+            if escape == r"\s":
+                out.append(RE2_SPACE_CLASS if in_class else "[" + RE2_SPACE_CLASS + "]")
+            elif escape == r"\d":
+                out.append(RE2_DIGIT_CLASS)
+            elif escape != r"\b" or in_class:
+                out.append(escape)
+            continue
+        if not in_class and pattern.startswith(("(?<!", "(?<="), i):
+            # RE2 has no lookbehind; dropping the assertion only widens the match
+            i = _group_end(pattern, i)
+            continue
+        if char == "[" and not in_class:
+            in_class = True
+        elif char == "]" and in_class:
+            in_class = False
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+def _group_end(pattern: str, start: int) -> int:
+    """Index just past the group opened at pattern[start]"""
+    depth = 0
+    in_class = False
+    i = start
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+# Categories that boost confidence on their own
+CRITICAL_CATEGORIES = frozenset({"urgency", "otp_pin_harvesting", "phishing"})
+
+# Categories that combine with urgency for an extra boost
+FINANCIAL_CATEGORIES = frozenset({"bank_fraud", "upi_fraud"})
+
+# Priority order for scam types
+SCAM_TYPE_PRIORITY = (
+    ("upi_fraud", ScamType.UPI_FRAUD),
+    ("bank_fraud", ScamType.BANK_FRAUD),
+    ("phishing", ScamType.PHISHING),
+    ("fake_offers", ScamType.FAKE_OFFER),
+    ("otp_pin_harvesting", ScamType.OTP_HARVESTING),
+)
+
+# Reasoning phrase per category, in output order
+REASONING_PARTS = (
+    ("urgency", "Creates false urgency"),
+    ("bank_fraud", "Impersonates bank"),
+    ("upi_fraud", "Requests UPI transfer"),
+    ("phishing", "Contains suspicious links"),
+    ("fake_offers", "Promises fake rewards"),
+    ("otp_pin_harvesting", "Requests sensitive codes"),
+    ("suspicious_keywords", "Uses suspicious terminology"),
+)
 
 
 class ScamDetector:
@@ -18,38 +125,134 @@ class ScamDetector:
     
     def __init__(self):
         self.compiled_patterns = self._compile_patterns()
+        self.pattern_set, self.pattern_ids = self._compile_pattern_set()
     
     def _compile_patterns(self) -> dict:
-        """Compile regex patterns for faster matching"""
+        """
+        Pair each pattern with its shared compiled regex (COMPILED_SCAM_PATTERNS)
+        
+        Pure literals (no regex syntax, e.g. "urgent") get None instead and are
+        checked with a substring test, since scanned text is already lowercased.
+        
+        Returns:
+            Dict of category -> list of (pattern string, compiled regex or None)
+        """
         compiled = {}
-        for category, patterns in SCAM_PATTERNS.items():
-            compiled[category] = [re.compile(p, re.IGNORECASE) for p in patterns]
+        for category, regexes in COMPILED_SCAM_PATTERNS.items():
+            compiled[category] = [
+                (r.pattern, None if re.escape(r.pattern) == r.pattern else r)
+                for r in regexes
+            ]
         return compiled
     
-    def detect(self, messages: List[Message]) -> ScamDetectionResult:
+    def _compile_pattern_set(self) -> tuple:
+        """
+        Compile all patterns into one RE2 set (a single DFA) when google-re2 is installed
+        
+        The set is only a prefilter: patterns are widened with _re2_superset,
+        so scan confirms each hit with the pattern's own re regex.
+        
+        Returns:
+            (re2.Set or None, list of (category, pattern, re regex or None) indexed by set id)
+        """
+        if re2 is None:
+            return None, []
+        
+        options = re2.Options()
+        options.case_sensitive = False
+        pattern_set = re2.Set.SearchSet(options)
+        pattern_ids = []
+        
+        try:
+            for category, patterns in self.compiled_patterns.items():
+                for pattern, regex in patterns:
+                    pattern_set.Add(_re2_superset(pattern))
+                    pattern_ids.append((category, pattern, regex))
+            pattern_set.Compile()
+        except re2.error:
+            # Unsupported syntax - stay on per-pattern re scan
+            return None, []
+        
+        return pattern_set, pattern_ids
+    
+    def detect(self, messages: List[Message],
+               prior: Optional[ScamDetectionResult] = None) -> ScamDetectionResult:
         """
         Analyze messages for scam indicators
         
+        Args:
+            messages: Full conversation so far
+            prior: Earlier result for the same conversation; only messages after
+                prior.messagesAnalyzed are scanned and merged into its matches
+        
         Returns:
             ScamDetectionResult with scamDetected, confidenceScore, scamType
         """
-        # Combine all messages into one text for analysis
-        all_text = " ".join([m.text for m in messages]).lower()
-        
-        # Find all matching indicators
-        indicators_found = []
         category_matches = {}
+        start = 0
+        if prior is not None:
+            category_matches = {k: list(v) for k, v in prior.categoryMatches.items()}
+            start = prior.messagesAnalyzed
+        
+        # Combine new messages into one text for analysis
+        new_text = " ".join([m.text_lower for m in messages[start:]])
+        
+        result = self.score(self.scan(new_text, category_matches))
+        result.messagesAnalyzed = len(messages)
+        return result
+    
+    def scan(self, text: str, category_matches: Optional[dict] = None) -> dict:
+        """
+        Find matching patterns in lowercased text
+        
+        Args:
+            text: Lowercased text to scan
+            category_matches: Prior matches to merge into (updated in place)
+        
+        Returns:
+            Dict of category -> matched pattern strings
+        """
+        if category_matches is None:
+            category_matches = {}
+        
+        # Prefilter: emoji, punctuation-only and blank turns can't match anything
+        if SCAN_TRIGGER_CHARS.isdisjoint(text) and (
+            text.isascii() or not SCAN_TRIGGER_PATTERN.search(text)
+        ):
+            return category_matches
+        
+        pattern_ids = None
+        if self.pattern_set is not None:
+            try:
+                # One pass reports candidate pattern ids (ids follow SCAM_PATTERNS order)
+                pattern_ids = sorted(self.pattern_set.Match(text) or ())
+            except UnicodeEncodeError:
+                # RE2 scans UTF-8; a lone surrogate (legal in a JSON string) can't be
+                # encoded, so such text takes the per-pattern re loop below
+                pass
+        
+        if pattern_ids is not None:
+            # Literals are exact, regex hits are confirmed with re
+            for pattern_id in pattern_ids:
+                category, pattern, regex = self.pattern_ids[pattern_id]
+                if regex is not None and not regex.search(text):
+                    continue
+                matches = category_matches.setdefault(category, [])
+                if pattern not in matches:
+                    matches.append(pattern)
+            return category_matches
         
         for category, patterns in self.compiled_patterns.items():
-            matches = []
-            for pattern in patterns:
-                if pattern.search(all_text):
-                    matches.append(pattern.pattern)
-            
-            if matches:
-                category_matches[category] = matches
-                indicators_found.extend(matches[:2])  # Limit indicators per category
+            for pattern, regex in patterns:
+                if (pattern in text) if regex is None else regex.search(text):
+                    matches = category_matches.setdefault(category, [])
+                    if pattern not in matches:
+                        matches.append(pattern)
         
+        return category_matches
+    
+    def score(self, category_matches: dict) -> ScamDetectionResult:
+        """Score matched categories into a detection result"""
         # If no indicators found, return negative
         if not category_matches:
             return ScamDetectionResult(
@@ -60,14 +263,15 @@ class ScamDetector:
                 reasoning="No scam indicators detected"
             )
         
-        # Calculate confidence score
-        confidence = self._calculate_confidence(category_matches, all_text)
+        indicators_found = []
+        for matches in category_matches.values():
+            indicators_found.extend(matches[:2])  # Limit indicators per category
         
-        # Determine scam type
-        scam_type = self._determine_scam_type(category_matches)
+        # Calculate confidence score
+        confidence = self._calculate_confidence(category_matches)
         
-        # Generate reasoning
-        reasoning = self._generate_reasoning(category_matches, scam_type)
+        # Determine scam type and reasoning
+        scam_type, reasoning = self._classify(category_matches)
         
         # Determine if scam detected based on threshold
         scam_detected = confidence >= settings.SCAM_DETECTION_THRESHOLD
@@ -76,100 +280,64 @@ class ScamDetector:
             scamDetected=scam_detected,
             confidenceScore=round(confidence, 2),
             scamType=scam_type,
-            indicators=list(set(indicators_found))[:10],
-            reasoning=reasoning
+            # Order-preserving dedup, stopping at the first 10 unique indicators
+            indicators=list(islice(dict.fromkeys(indicators_found), 10)),
+            reasoning=reasoning,
+            categoryMatches=category_matches
         )
     
-    def _calculate_confidence(self, category_matches: dict, text: str) -> float:
+    def _calculate_confidence(self, category_matches: dict) -> float:
         """
         Calculate confidence score based on:
         - Number of categories matched
         - Number of patterns matched per category
         - Critical indicators present
         """
+        matched = category_matches.keys()
         base_score = 0.0
         
         # Score based on number of categories
-        num_categories = len(category_matches)
-        base_score += min(num_categories * 0.15, 0.45)
+        base_score += min(len(matched) * 0.15, 0.45)
         
         # Bonus for multiple patterns in same category
-        for category, matches in category_matches.items():
+        for matches in category_matches.values():
             if len(matches) >= 2:
                 base_score += 0.1
             if len(matches) >= 3:
                 base_score += 0.1
         
         # Critical indicators boost confidence significantly
-        critical_categories = ["urgency", "otp_pin_harvesting", "phishing"]
-        for crit in critical_categories:
-            if crit in category_matches:
-                base_score += 0.15
+        # (added one at a time to keep the exact float sums)
+        for _ in matched & CRITICAL_CATEGORIES:
+            base_score += 0.15
         
         # UPI fraud is very common
-        if "upi_fraud" in category_matches:
+        if "upi_fraud" in matched:
             base_score += 0.1
         
         # Bank fraud indicators
-        if "bank_fraud" in category_matches:
+        if "bank_fraud" in matched:
             base_score += 0.1
         
         # Check for combination of urgency + financial
-        if "urgency" in category_matches and \
-           ("bank_fraud" in category_matches or "upi_fraud" in category_matches):
+        if "urgency" in matched and not matched.isdisjoint(FINANCIAL_CATEGORIES):
             base_score += 0.15
         
         # Cap at 0.99
         return min(base_score, 0.99)
     
-    def _determine_scam_type(self, category_matches: dict) -> ScamType:
-        """Determine the primary scam type from matched categories"""
-        
-        # Priority order for scam types
-        priority = [
-            ("upi_fraud", ScamType.UPI_FRAUD),
-            ("bank_fraud", ScamType.BANK_FRAUD),
-            ("phishing", ScamType.PHISHING),
-            ("fake_offers", ScamType.FAKE_OFFER),
-            ("otp_pin_harvesting", ScamType.OTP_HARVESTING),
-        ]
-        
-        for category, scam_type in priority:
-            if category in category_matches:
-                return scam_type
-        
-        # If only urgency or suspicious keywords, might be phishing
-        if "urgency" in category_matches or "suspicious_keywords" in category_matches:
-            return ScamType.PHISHING
-        
-        return ScamType.UNKNOWN
-    
-    def _generate_reasoning(self, category_matches: dict, scam_type: ScamType) -> str:
-        """Generate internal reasoning for detection"""
-        parts = []
-        
-        if "urgency" in category_matches:
-            parts.append("Creates false urgency")
+    def _classify(self, category_matches: dict) -> Tuple[ScamType, str]:
+        """Determine the primary scam type and internal reasoning"""
+        parts = [reason for category, reason in REASONING_PARTS if category in category_matches]
         
-        if "bank_fraud" in category_matches:
-            parts.append("Impersonates bank")
-        
-        if "upi_fraud" in category_matches:
-            parts.append("Requests UPI transfer")
-        
-        if "phishing" in category_matches:
-            parts.append("Contains suspicious links")
-        
-        if "fake_offers" in category_matches:
-            parts.append("Promises fake rewards")
-        
-        if "otp_pin_harvesting" in category_matches:
-            parts.append("Requests sensitive codes")
-        
-        if "suspicious_keywords" in category_matches:
-            parts.append("Uses suspicious terminology")
+        scam_type = next(
+            (scam_type for category, scam_type in SCAM_TYPE_PRIORITY if category in category_matches),
+            # If only urgency or suspicious keywords, might be phishing
+            ScamType.PHISHING if parts else ScamType.UNKNOWN
+        )
         
-        return f"Detected {scam_type.value}: " + "; ".join(parts) if parts else "Low confidence detection"
+        reasoning = f"Detected {scam_type.value}: " + "; ".join(parts) if parts else "Low confidence detection"
+        return scam_type, reasoning
     
     def quick_check(self, text: str) -> Tuple[bool, float]:
         """Quick check for single message - returns (is_suspicious, confidence)"""
@@ -182,6 +350,7 @@ class ScamDetector:
 detector = ScamDetector()
 
 
-def detect_scam(messages: List[Message]) -> ScamDetectionResult:
+def detect_scam(messages: List[Message],
+                prior: Optional[ScamDetectionResult] = None) -> ScamDetectionResult:
     """Convenience function for scam detection"""
-    return detector.detect(messages)
+    return detector.detect(messages, prior)
@@ -3,12 +3,113 @@ GUVI Agentic Scam HoneyPot - Intelligence Extraction Engine
 Extracts actionable intelligence from scammer messages
 """
 
+import hashlib
 import re
-from typing import List, Set
-from urllib.parse import urlparse
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional, Set
 
 from core.models import Message, ExtractedIntelligence
-from core.config import EXTRACTION_PATTERNS, SCAM_PATTERNS
+from core.config import COMPILED_EXTRACTION_PATTERNS, SCAM_PATTERNS
+
+try:
+    import pcre2  # optional: JIT-compiled PCRE2 with a re-compatible API
+except ImportError:
+    pcre2 = None
+
+try:
+    import ahocorasick  # optional: pyahocorasick, single-pass keyword scan
+except ImportError:
+    ahocorasick = None
+
+try:
+    from Levenshtein import distance as edit_distance  # optional: C edit distance
+except ImportError:
+    edit_distance = None
+
+
+# Each data type is scanned separately: matches never overlap within one scan,
+# so a shared alternation would let one type claim a span another type also
+# needs (a 10-digit number is both a phone and an account candidate)
+SCAN_ORDER = ("phishing_link", "upi_id", "ifsc_code", "phone_number", "bank_account")
+
+
+def _build_scan_pattern(data_type: str):
+    """
+    Combine one data type's extraction regexes into a named-group alternation
+    
+    Returns the compiled pattern, the same alternation compiled with re,
+    and a map of group name to the group holding the value.
+    
+    This stays on a backtracking engine: the UPI and bank patterns rely on
+    lookarounds and every match needs its capture group, neither of which
+    DFA multi-pattern engines (Hyperscan/Vectorscan, RE2 sets) support.
+    With pcre2 installed the pattern is JIT-compiled to machine code;
+    otherwise stdlib re is used (same matches, same Match API). pcre2 scans
+    UTF-8, so text it can't encode (lone surrogates) uses the re copy.
+    """
+    parts = []
+    value_groups = {}
+    group_index = 1
+    for i, regex in enumerate(COMPILED_EXTRACTION_PATTERNS[data_type]["regex"]):
+        name = f"{data_type}_{i}"
+        parts.append(f"(?P<{name}>{regex.pattern})")
+        # Patterns with a capture group report its value, as match.group(1) did
+        inner_groups = regex.groups
+        value_groups[name] = group_index + 1 if inner_groups else group_index
+        group_index += 1 + inner_groups
+    
+    source = "|".join(parts)
+    fallback = re.compile(source, re.IGNORECASE)
+    if pcre2 is not None:
+        try:
+            return pcre2.compile(source, pcre2.IGNORECASE, jit=True), fallback, value_groups
+        except pcre2.error:
+            pass  # Unsupported syntax - fall back to re
+    return fallback, fallback, value_groups
+
+
+# data type -> (compiled alternation, re alternation, group name -> value group)
+SCAN_PATTERNS = {data_type: _build_scan_pattern(data_type) for data_type in SCAN_ORDER}
+
+# Every extraction regex needs a digit (accounts, IFSC, phones), "@" (UPI IDs)
+# or the "/" / "." of a link; text with none of these skips all scans
+SCAN_TRIGGER_PATTERN = re.compile(r"[\d@./]")
+
+# Host part of a URL; userinfo is skipped so "http://paytm.com@evil.xyz" yields evil.xyz
+DOMAIN_PATTERN = re.compile(r"^(?:https?://)?(?:[^/?#@]*@)?(?:www\.)?([^/:?#]+)", re.IGNORECASE)
+
+# Separators ("+", spaces, dashes) stripped from phone matches in one C-level pass
+NON_DIGIT_PATTERN = re.compile(r"\D+")
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance (pure Python fallback for the Levenshtein package)"""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+if edit_distance is None:
+    edit_distance = _edit_distance
+
+
+# Recent extract_text results kept, keyed by text digest (scam templates repeat
+# across sessions, and callers re-extract the same history)
+EXTRACTION_CACHE_SIZE = 1024
+
+# Max items kept per intelligence field (same caps as the per-type extractors)
+FIELD_LIMITS = {
+    "bankAccounts": 5,
+    "ifscCodes": 5,
+    "upiIds": 5,
+    "phishingLinks": 10,
+    "phoneNumbers": 5,
+    "suspiciousKeywords": 15,
+}
 
 
 class IntelligenceExtractor:
@@ -16,8 +117,8 @@ class IntelligenceExtractor:
     Extracts bank accounts, UPI IDs, phishing links, phone numbers, etc.
     """
     
-    # Known legitimate domains to filter
-    LEGITIMATE_DOMAINS = {
+    # Known legitimate domains to filter (frozen: shared read-only by every caller)
+    LEGITIMATE_DOMAINS = frozenset({
         "google.com", "gmail.com", "yahoo.com", "hotmail.com",
         "facebook.com", "instagram.com", "twitter.com", "x.com",
         "youtube.com", "linkedin.com",
@@ -27,21 +128,53 @@ class IntelligenceExtractor:
         "axisbank.com", "pnbindia.in", "bankofbaroda.in",
         "rbi.org.in", "npci.org.in",
         "whatsapp.com", "telegram.org",
-    }
+    })
     
-    # Suspicious TLDs
-    SUSPICIOUS_TLDS = {".tk", ".ml", ".ga", ".cf", ".top", ".xyz", ".club", ".online", ".site"}
+    # Suspicious TLDs (a tuple, so str.endswith checks them all in one call)
+    SUSPICIOUS_TLDS = (".tk", ".ml", ".ga", ".cf", ".top", ".xyz", ".club", ".online", ".site")
+    
+    # Domain substrings that mark a URL as suspicious: phishing words and shorteners
+    URL_SUSPICIOUS_KEYWORDS = ("verify", "secure", "login", "update", "kyc", "confirm", "validate")
+    URL_SHORTENERS = ("bit.ly", "tinyurl", "t.co", "short.link", "goo.gl")
+    
+    # Lookalike substitutions folded before comparing a label to brand names
+    HOMOGLYPHS = (("rn", "m"), ("vv", "w"), ("0", "o"), ("1", "l"), ("3", "e"), ("5", "s"), ("@", "a"))
+    
+    # Max edits for a label to count as a misspelt brand (e.g. gooogle, paytn)
+    TYPOSQUAT_MAX_DISTANCE = 2
+    
+    # Brands shorter than this (x, sbi, rbi) only match exactly after folding;
+    # substring and edit-distance checks would flag nearly every domain
+    TYPOSQUAT_MIN_BRAND_LENGTH = 4
+    
+    # Urgent phrases reported as keywords alongside the pattern-derived ones
+    URGENT_PHRASES = (
+        "account blocked", "verify now", "urgent", "immediately",
+        "hurry up", "last chance", "expires today", "final notice",
+        "suspended", "limited time", "act now"
+    )
     
     def __init__(self):
-        self.compiled_patterns = self._compile_patterns()
         self.scam_keywords = self._load_scam_keywords()
-    
-    def _compile_patterns(self) -> dict:
-        """Compile extraction patterns"""
-        compiled = {}
-        for data_type, config in EXTRACTION_PATTERNS.items():
-            compiled[data_type] = [re.compile(p, re.IGNORECASE) for p in config["regex"]]
-        return compiled
+        # (lowercased, reported) keyword pairs: scam keywords then urgent phrases,
+        # deduplicated with the first occurrence kept
+        keyword_map = {}
+        for keyword in (*self.scam_keywords, *self.URGENT_PHRASES):
+            keyword_map.setdefault(keyword.lower(), keyword)
+        self.keyword_index = tuple(keyword_map.items())
+        self.keyword_automaton = self._build_keyword_automaton()
+        # Subdomains of legitimate domains, checked with one endswith(tuple)
+        self.legit_suffixes = tuple("." + legit for legit in self.LEGITIMATE_DOMAINS)
+        # Brand labels (e.g. "paytm" from paytm.com) for the typosquatting check
+        self.legit_roots = tuple(dict.fromkeys(legit.split('.')[0] for legit in self.LEGITIMATE_DOMAINS))
+        # Keywords and shorteners in one literal alternation (single scan per domain);
+        # the group that matched tells which kind of marker was found
+        self.url_marker_pattern = re.compile(
+            "(?P<keyword>" + "|".join(map(re.escape, self.URL_SUSPICIOUS_KEYWORDS)) + ")"
+            "|(?P<shortener>" + "|".join(map(re.escape, self.URL_SHORTENERS)) + ")"
+        )
+        # blake2b digest of text -> extracted field values (LRU, oldest first)
+        self._cache: OrderedDict = OrderedDict()
     
     def _load_scam_keywords(self) -> List[str]:
         """Load suspicious keywords from patterns"""
@@ -54,6 +187,22 @@ class IntelligenceExtractor:
                     keywords.append(keyword)
         return keywords
     
+    def _build_keyword_automaton(self):
+        """
+        Build one Aho-Corasick automaton over scam keywords and urgent phrases
+        
+        Returns None when pyahocorasick isn't installed (per-keyword scan is used).
+        """
+        if ahocorasick is None:
+            return None
+        
+        # Values carry list position so hits can be reported in keyword order
+        automaton = ahocorasick.Automaton()
+        for rank, (keyword_lower, keyword) in enumerate(self.keyword_index):
+            automaton.add_word(keyword_lower, (rank, keyword))
+        automaton.make_automaton()
+        return automaton
+    
     def extract(self, messages: List[Message]) -> ExtractedIntelligence:
         """
         Extract all intelligence from messages
@@ -61,182 +210,259 @@ class IntelligenceExtractor:
         Returns:
             ExtractedIntelligence with all extracted data
         """
-        # Combine all scammer messages
-        scammer_text = " ".join([m.text for m in messages if m.sender == "scammer"])
+        # Combine all scammer messages (lowercase joined from the per-message cache)
+        scammer_messages = [m for m in messages if m.sender == "scammer"]
+        scammer_text = " ".join([m.text for m in scammer_messages])
+        scammer_text_lower = " ".join([m.text_lower for m in scammer_messages])
+        
+        return self.extract_text(scammer_text, scammer_text_lower)
+    
+    def extract_incremental(self, new_message: Message,
+                            prior: Optional[ExtractedIntelligence] = None) -> ExtractedIntelligence:
+        """
+        Extract from one newly arrived message and merge into prior results
         
-        intelligence = ExtractedIntelligence()
+        Only the new message is scanned, so a conversation's total extraction
+        work grows with its length rather than its length squared.
         
-        # Extract each type
-        intelligence.bankAccounts = self._extract_bank_accounts(scammer_text)
-        intelligence.ifscCodes = self._extract_ifsc_codes(scammer_text)
-        intelligence.upiIds = self._extract_upi_ids(scammer_text)
-        intelligence.phishingLinks = self._extract_phishing_links(scammer_text)
-        intelligence.phoneNumbers = self._extract_phone_numbers(scammer_text)
-        intelligence.suspiciousKeywords = self._extract_suspicious_keywords(scammer_text)
+        Args:
+            new_message: Message added since prior was computed
+            prior: Intelligence extracted so far (not modified)
         
+        Returns:
+            Merged ExtractedIntelligence, deduplicated and capped per FIELD_LIMITS
+        """
+        intelligence = prior.model_copy(deep=True) if prior else ExtractedIntelligence()
+        if new_message.sender == "scammer":
+            intelligence.merge(
+                self.extract_text(new_message.text, new_message.text_lower),
+                FIELD_LIMITS
+            )
         return intelligence
     
-    def _extract_bank_accounts(self, text: str) -> List[str]:
+    def extract_text(self, text: str, text_lower: Optional[str] = None) -> ExtractedIntelligence:
+        """
+        Extract all intelligence from raw scammer text
+        
+        Args:
+            text: Scammer text as received
+            text_lower: text.lower(), if the caller already has it (e.g. Message.text_lower)
+        
+        Results are cached by a digest of the text as plain field dicts;
+        model_validate copies the lists into a new ExtractedIntelligence on
+        every call, so callers may mutate it.
+        """
+        # surrogatepass: a lone surrogate (legal in a JSON string) must not break the key
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+        else:
+            cached = self._scan(text, text_lower)
+            self._cache[key] = cached
+            if len(self._cache) > EXTRACTION_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        
+        return ExtractedIntelligence.model_validate(cached)
+    
+    def _scan(self, text: str, text_lower: Optional[str]) -> Dict[str, List[str]]:
+        """Scan text and normalize matches (uncached extract_text, as field dict)"""
+        if text_lower is None:
+            text_lower = text.lower()
+        
+        # One scan per type, so types can share a span (digits in a UPI ID or URL)
+        candidates = {data_type: [] for data_type in SCAN_ORDER}
+        if SCAN_TRIGGER_PATTERN.search(text):
+            # pcre2 scans UTF-8; a lone surrogate (legal in a JSON string) can't be encoded
+            encodable = True
+            if not text.isascii():
+                try:
+                    text.encode()
+                except UnicodeEncodeError:
+                    encodable = False
+            
+            for data_type, (pattern, fallback, value_groups) in SCAN_PATTERNS.items():
+                # UPI IDs need "@" and links a scheme or "www."; skip scans that can't match
+                if data_type == "upi_id" and "@" not in text:
+                    continue
+                if data_type == "phishing_link" and "://" not in text and "www." not in text_lower:
+                    continue
+                candidates[data_type] = [
+                    match.group(value_groups[match.lastgroup])
+                    for match in (pattern if encodable else fallback).finditer(text)
+                ]
+        
+        # Normalize and filter each type
+        return {
+            "bankAccounts": self._extract_bank_accounts(candidates["bank_account"]),
+            "ifscCodes": self._extract_ifsc_codes(candidates["ifsc_code"]),
+            "upiIds": self._extract_upi_ids(candidates["upi_id"]),
+            "phishingLinks": self._extract_phishing_links(candidates["phishing_link"]),
+            "phoneNumbers": self._extract_phone_numbers(candidates["phone_number"]),
+            "suspiciousKeywords": self._extract_suspicious_keywords(text_lower),
+        }
+    
+    def _extract_bank_accounts(self, candidates: List[str]) -> List[str]:
         """Extract bank account numbers"""
         accounts = []
-        patterns = self.compiled_patterns.get("bank_account", [])
-        
-        for pattern in patterns:
-            for match in pattern.finditer(text):
-                account = match.group(1) if match.groups() else match.group(0)
-                account = ''.join(c for c in account if c.isdigit())
-                
-                # Validate
-                if EXTRACTION_PATTERNS["bank_account"]["validate"](account):
-                    if account not in accounts:
-                        accounts.append(account)
+        
+        # Patterns only capture 9-18 digit runs
+        for account in candidates:
+            if account not in accounts:
+                accounts.append(account)
         
         return accounts[:5]  # Limit to 5
     
-    def _extract_ifsc_codes(self, text: str) -> List[str]:
+    def _extract_ifsc_codes(self, candidates: List[str]) -> List[str]:
         """Extract IFSC codes"""
         codes = []
-        patterns = self.compiled_patterns.get("ifsc_code", [])
         
-        for pattern in patterns:
-            for match in pattern.finditer(text):
-                code = match.group(1) if match.groups() else match.group(0)
-                code = code.upper().strip()
-                
-                if EXTRACTION_PATTERNS["ifsc_code"]["validate"](code):
-                    if code not in codes:
-                        codes.append(code)
+        for code in candidates:
+            code = code.upper()
+            
+            if code not in codes:
+                codes.append(code)
         
         return codes[:5]
     
-    def _extract_upi_ids(self, text: str) -> List[str]:
+    def _extract_upi_ids(self, candidates: List[str]) -> List[str]:
         """Extract UPI IDs"""
         upis = []
-        patterns = self.compiled_patterns.get("upi_id", [])
-        
-        for pattern in patterns:
-            for match in pattern.finditer(text):
-                upi = match.group(1) if match.groups() else match.group(0)
-                upi = upi.lower().strip()
-                
-                # Filter out common false positives
-                if '@' in upi and not upi.endswith(('@gmail.com', '@yahoo.com', '@hotmail.com')):
-                    if EXTRACTION_PATTERNS["upi_id"]["validate"](upi):
-                        if upi not in upis:
-                            upis.append(upi)
+        
+        for upi in candidates:
+            upi = upi.lower()
+            
+            # Filter out common false positives
+            if not upi.endswith(('@gmail.com', '@yahoo.com', '@hotmail.com')):
+                if upi not in upis:
+                    upis.append(upi)
         
         return upis[:5]
     
-    def _extract_phishing_links(self, text: str) -> List[str]:
+    def _extract_phishing_links(self, candidates: List[str]) -> List[str]:
         """Extract and filter phishing links"""
         links = []
-        patterns = self.compiled_patterns.get("phishing_link", [])
-        
-        for pattern in patterns:
-            for match in pattern.finditer(text):
-                url = match.group(0).strip()
-                
-                # Skip if not valid URL
-                if not url.startswith(("http://", "https://", "www.")):
-                    continue
-                
-                # Check if suspicious
-                if self._is_suspicious_url(url):
-                    if url not in links:
-                        links.append(url)
+        
+        for url in candidates:
+            url = url.strip()
+            
+            # Skip if not valid URL
+            if not url.startswith(("http://", "https://", "www.")):
+                continue
+            
+            # Check if suspicious
+            if self._is_suspicious_url(url):
+                if url not in links:
+                    links.append(url)
         
         return links[:10]
     
+    def _url_domain(self, url: str) -> str:
+        """Host without scheme, credentials, www prefix, port or path"""
+        match = DOMAIN_PATTERN.match(url)
+        return match.group(1).lower() if match else ""
+    
     def _is_suspicious_url(self, url: str) -> bool:
         """Check if URL is potentially suspicious"""
         try:
-            # Parse URL
-            if url.startswith("www."):
-                url = "http://" + url
-            
-            parsed = urlparse(url)
-            domain = parsed.netloc.lower()
-            
-            # Remove www prefix for comparison
-            if domain.startswith("www."):
-                domain = domain[4:]
+            domain = self._url_domain(url)
             
             # Check against legitimate domains
-            for legit in self.LEGITIMATE_DOMAINS:
-                if domain == legit or domain.endswith("." + legit):
-                    return False
-            
-            # Check for suspicious TLDs
-            if any(domain.endswith(tld) for tld in self.SUSPICIOUS_TLDS):
-                return True
-            
-            # Check for typosquatting (e.g., paytm-secure.com)
-            for legit in self.LEGITIMATE_DOMAINS:
-                legit_name = legit.split('.')[0]
-                if legit_name in domain and domain != legit:
-                    return True
-            
-            # Check for suspicious keywords in URL
-            suspicious_keywords = ['verify', 'secure', 'login', 'update', 'kyc', 'confirm', 'validate']
-            if any(kw in domain for kw in suspicious_keywords):
-                return True
-            
-            # Shortened URLs are suspicious
-            if any(short in domain for short in ['bit.ly', 'tinyurl', 't.co', 'short.link', 'goo.gl']):
-                return True
+            if domain in self.LEGITIMATE_DOMAINS or domain.endswith(self.legit_suffixes):
+                return False
             
             return True  # Unknown URLs are suspicious by default
             
         except Exception:
             return True  # If parsing fails, consider suspicious
     
-    def _extract_phone_numbers(self, text: str) -> List[str]:
-        """Extract phone numbers"""
-        numbers = []
-        patterns = self.compiled_patterns.get("phone_number", [])
-        
-        for pattern in patterns:
-            for match in pattern.finditer(text):
-                number = match.group(1) if match.groups() else match.group(0)
-                
-                # Normalize
-                digits = ''.join(c for c in number if c.isdigit())
-                
-                if len(digits) == 10:
-                    normalized = f"+91{digits}"
-                elif len(digits) == 12 and digits.startswith("91"):
-                    normalized = f"+{digits}"
-                elif len(digits) > 10:
-                    normalized = f"+{digits}"
-                else:
-                    continue
-                
-                if normalized not in numbers:
-                    numbers.append(normalized)
+    def url_red_flags(self, url: str) -> List[str]:
+        """
+        Explain why a reported phishing link looks malicious
         
-        return numbers[:5]
+        Every non-legitimate link is already reported; these reasons
+        (suspicious TLD, brand lookalike, phishing keyword, URL shortener)
+        go into the agent notes.
+        """
+        domain = self._url_domain(url)
+        flags = []
+        
+        if domain.endswith(self.SUSPICIOUS_TLDS):
+            flags.append("suspicious TLD")
+        
+        # Typosquatting (e.g., paytm-secure.com, goog1e.com)
+        if self._is_typosquat(domain):
+            flags.append("brand lookalike domain")
+        
+        # Suspicious keywords in URL, or a URL shortener
+        markers = {match.lastgroup for match in self.url_marker_pattern.finditer(domain)}
+        if "keyword" in markers:
+            flags.append("phishing keyword in domain")
+        if "shortener" in markers:
+            flags.append("URL shortener")
+        
+        return flags
     
-    def _extract_suspicious_keywords(self, text: str) -> List[str]:
-        """Extract suspicious keywords found in text"""
-        text_lower = text.lower()
-        found = []
+    def _is_typosquat(self, domain: str) -> bool:
+        """
+        Check if a (non-legitimate) domain imitates a known brand
+        
+        A label imitates a brand if it embeds the brand name (paytm-secure),
+        equals it after folding homoglyphs (goog1e, 5bi), or is within
+        TYPOSQUAT_MAX_DISTANCE edits of it (gooogle).
+        """
+        for label in domain.split('.')[:-1]:  # Skip the TLD
+            folded = label
+            for lookalike, char in self.HOMOGLYPHS:
+                folded = folded.replace(lookalike, char)
+            
+            for root in self.legit_roots:
+                if folded == root:
+                    return True
+                if len(root) < self.TYPOSQUAT_MIN_BRAND_LENGTH:
+                    continue
+                if root in folded:
+                    return True
+                if abs(len(folded) - len(root)) <= self.TYPOSQUAT_MAX_DISTANCE and \
+                        edit_distance(folded, root) <= self.TYPOSQUAT_MAX_DISTANCE:
+                    return True
         
-        for keyword in self.scam_keywords:
-            if keyword.lower() in text_lower:
-                found.append(keyword)
+        return False
+    
+    def _extract_phone_numbers(self, candidates: List[str]) -> List[str]:
+        """Extract phone numbers"""
+        numbers = []
         
-        # Also check for specific urgent phrases
-        urgent_phrases = [
-            "account blocked", "verify now", "urgent", "immediately",
-            "hurry up", "last chance", "expires today", "final notice",
-            "suspended", "limited time", "act now"
-        ]
+        for number in candidates:
+            # Normalize
+            digits = NON_DIGIT_PATTERN.sub("", number)
+            
+            # Bare 10-digit numbers get +91; longer ones (incl. 91XXXXXXXXXX)
+            # already carry their country code
+            if len(digits) == 10:
+                normalized = "+91" + digits
+            elif len(digits) > 10:
+                normalized = "+" + digits
+            else:
+                continue
+            
+            if normalized not in numbers:
+                numbers.append(normalized)
         
-        for phrase in urgent_phrases:
-            if phrase in text_lower and phrase not in found:
-                found.append(phrase)
+        return numbers[:5]
+    
+    def _extract_suspicious_keywords(self, text_lower: str) -> List[str]:
+        """Extract suspicious keywords found in lowercased text"""
+        if self.keyword_automaton is not None:
+            # One pass reports every keyword/phrase occurrence; report in keyword order
+            found = sorted({value for _, value in self.keyword_automaton.iter(text_lower)})
+            return [keyword for _, keyword in found[:15]]  # Limit
         
-        return list(set(found))[:15]  # Limit and deduplicate
+        # One loop over the merged keyword/phrase list, stopping at the limit
+        return list(islice(
+            (keyword for keyword_lower, keyword in self.keyword_index if keyword_lower in text_lower),
+            15
+        ))
     
     def extract_from_text(self, text: str) -> ExtractedIntelligence:
         """Extract from single text (convenience method)"""
@@ -251,3 +477,8 @@ extractor = IntelligenceExtractor()
 def extract_intelligence(messages: List[Message]) -> ExtractedIntelligence:
     """Convenience function"""
     return extractor.extract(messages)
+
+
+def url_red_flags(url: str) -> List[str]:
+    """Convenience function"""
+    return extractor.url_red_flags(url)
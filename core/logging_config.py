@@ -0,0 +1,55 @@
+"""
+GUVI Agentic Scam HoneyPot - Logging Setup
+Root logger writes through a queue so stream I/O happens off the request path
+"""
+
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from core.config import settings
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+def start_logging():
+    """
+    Route root logger through a QueueHandler
+
+    Records are formatted and written by a QueueListener thread.
+    Level is LOG_LEVEL, or DEBUG when settings.DEBUG is on.
+    """
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+
+    _queue_handler = QueueHandler(log_queue)
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.DEBUG if settings.DEBUG else settings.LOG_LEVEL.upper())
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and detach the queue handler"""
+    global _listener, _queue_handler
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
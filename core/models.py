@@ -3,7 +3,9 @@ GUVI Agentic Scam HoneyPot - Data Models
 Strictly follows GUVI Hackathon specifications
 """
 
-from pydantic import BaseModel, Field
+from functools import cached_property
+from itertools import islice
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
 from typing import List, Dict, Optional, Literal
 from datetime import datetime
 from enum import Enum
@@ -21,6 +23,28 @@ class Message(BaseModel):
     sender: Literal["scammer", "user", "agent"]
     text: str
     timestamp: Optional[int] = None  # Unix timestamp in milliseconds
+    
+    @field_validator("text")
+    @classmethod
+    def replace_lone_surrogates(cls, text: str) -> str:
+        """
+        Replace lone UTF-16 surrogates with U+FFFD
+        
+        JSON strings may carry them ("\\ud800"), but UTF-8 can't: orjson and
+        pydantic's JSON encoder (session storage, callback payload) reject them.
+        """
+        if text.isascii():
+            return text
+        try:
+            text.encode()
+            return text
+        except UnicodeEncodeError:
+            return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+    
+    @cached_property
+    def text_lower(self) -> str:
+        """Lowercased text, computed once per message (used for pattern scans)"""
+        return self.text.lower()
 
 
 class Metadata(BaseModel):
@@ -109,6 +133,8 @@ class ScamDetectionResult(BaseModel):
     scamType: ScamType = Field(default=ScamType.UNKNOWN, description="Type of scam detected")
     indicators: List[str] = Field(default_factory=list, description="Detected scam indicators")
     reasoning: str = Field(default="", description="Internal reasoning for detection")
+    categoryMatches: Dict[str, List[str]] = Field(default_factory=dict, description="Matched patterns by category")
+    messagesAnalyzed: int = Field(default=0, ge=0, description="Session messages covered by this result")
 
 
 class ExtractedIntelligence(BaseModel):
@@ -140,6 +166,21 @@ class ExtractedIntelligence(BaseModel):
             self.phoneNumbers
         ])
     
+    def merge(self, other: "ExtractedIntelligence", limits: Optional[Dict[str, int]] = None):
+        """
+        Merge another extraction into this one, keeping order and dropping duplicates
+        
+        Args:
+            other: Extraction to merge in
+            limits: Optional max items per field name (earliest items are kept)
+        """
+        for name in type(self).model_fields:
+            current = getattr(self, name)
+            merged = dict.fromkeys(current + getattr(other, name))
+            if limits and name in limits:
+                merged = islice(merged, limits[name])
+            current[:] = merged
+    
     def get_summary(self) -> str:
         """Get summary of extracted intelligence"""
         items = []
@@ -168,6 +209,9 @@ class SessionState(BaseModel):
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     updatedAt: datetime = Field(default_factory=datetime.utcnow)
     messages: List[Message] = Field(default_factory=list)
+    scammerMessageCount: int = 0
+    agentMessageCount: int = 0
+    metadata: Dict = Field(default_factory=dict)
     detectionResult: Optional[ScamDetectionResult] = None
     extractedIntelligence: ExtractedIntelligence = Field(default_factory=ExtractedIntelligence)
     engagementMetrics: EngagementMetrics = Field(default_factory=EngagementMetrics)
@@ -175,13 +219,44 @@ class SessionState(BaseModel):
     callbackSent: bool = False
     agentNotes: str = ""
     
+    # hash((sender, text)) of every message, for O(1) history dedup
+    _message_fingerprints: set = PrivateAttr(default_factory=set)
+    _last_scammer_text: Optional[str] = PrivateAttr(default=None)
+    _persisted_message_count: int = PrivateAttr(default=0)  # Messages already in the store
+    
+    def model_post_init(self, __context):
+        """Index messages loaded at construction"""
+        self._message_fingerprints = {hash((m.sender, m.text)) for m in self.messages}
+        self._last_scammer_text = next(
+            (m.text for m in reversed(self.messages) if m.sender == "scammer"), None
+        )
+    
+    @property
+    def last_scammer_text(self) -> Optional[str]:
+        """Text of the most recently added scammer message"""
+        return self._last_scammer_text
+    
+    def has_message(self, message: Message) -> bool:
+        """Check if an identical message is already in the session"""
+        return hash((message.sender, message.text)) in self._message_fingerprints
+    
+    def add_message(self, message: Message):
+        """Append message and keep sender counters in sync"""
+        self.messages.append(message)
+        self._message_fingerprints.add(hash((message.sender, message.text)))
+        if message.sender == "scammer":
+            self.scammerMessageCount += 1
+            self._last_scammer_text = message.text
+        elif message.sender == "agent":
+            self.agentMessageCount += 1
+    
     def get_scammer_message_count(self) -> int:
         """Count scammer messages"""
-        return len([m for m in self.messages if m.sender == "scammer"])
+        return self.scammerMessageCount
     
     def get_agent_message_count(self) -> int:
         """Count agent messages"""
-        return len([m for m in self.messages if m.sender == "agent"])
+        return self.agentMessageCount
 
 
 class GUVICallbackPayload(BaseModel):
@@ -204,7 +279,9 @@ class GUVICallbackPayload(BaseModel):
     extractedIntelligence: ExtractedIntelligence
     agentNotes: str
     
+    # Built once per session at callback time: build the schema on first use, not import
     model_config = {
+        "defer_build": True,
         "json_schema_extra": {
             "example": {
                 "sessionId": "sess_abc123",
@@ -228,3 +305,5 @@ class HealthResponse(BaseModel):
     status: str
     version: str
     timestamp: str
+    
+    model_config = {"defer_build": True}
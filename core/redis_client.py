@@ -0,0 +1,41 @@
+"""
+GUVI Agentic Scam HoneyPot - Redis Client
+Shared async Redis connection for state that must survive across workers
+"""
+
+from typing import Optional
+
+import redis.asyncio as redis
+
+from core.config import settings
+
+
+_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Get the shared Redis client
+    
+    Returns:
+        Redis client, or None if REDIS_URL is not configured
+    """
+    global _client
+    
+    if not settings.REDIS_URL:
+        return None
+    
+    if _client is None:
+        # unix:///var/run/redis/redis.sock avoids TCP overhead on localhost
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    
+    return _client
+
+
+async def close_redis():
+    """Close shared Redis client"""
+    global _client
+    
+    if _client is not None:
+        await _client.aclose()
+        _client = None